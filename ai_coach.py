@@ -1,348 +1,616 @@
-import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-import bcrypt
-import time
-import requests
-from datetime import datetime, timedelta
-from supabase import create_client, Client
-
-# ==========================================
-# 1. CẤU HÌNH & KẾT NỐI (V59 - BUG FIX DELETE)
-# ==========================================
-st.set_page_config(page_title="LD PRO COACH - System", layout="wide", page_icon="🦁")
-
-# --- KẾT NỐI SUPABASE ---
-try:
-    SUPABASE_URL = st.secrets["supabase"]["URL"]
-    SUPABASE_KEY = st.secrets["supabase"]["KEY"]
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-except Exception as e:
-    st.error("❌ Lỗi cấu hình Secrets."); st.stop()
-
-# ==========================================
-# 2. HÀM XỬ LÝ (CORE LOGIC)
-# ==========================================
-
-def send_telegram(message):
-    try:
-        token = st.secrets["telegram"]["bot_token"]
-        chat_id = st.secrets["telegram"]["chat_id"]
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
-        requests.post(url, json={"chat_id": chat_id, "text": message})
-    except: pass 
-
-def run_query(table_name, select="*", order_by=None, filter_col=None, filter_val=None):
-    try:
-        query = supabase.table(table_name).select(select)
-        if filter_col and filter_val is not None: query = query.eq(filter_col, filter_val)
-        if order_by: query = query.order(order_by[0], desc=(order_by[1]=='desc'))
-        return pd.DataFrame(query.execute().data)
-    except: return pd.DataFrame()
-
-def insert_data(table_name, data_dict):
-    try: supabase.table(table_name).insert(data_dict).execute(); return True, ""
-    except Exception as e: return False, str(e)
-
-def update_data(table_name, update_dict, match_col, match_val):
-    try: supabase.table(table_name).update(update_dict).eq(match_col, match_val).execute(); return True
-    except: return False
-
-def delete_data(table_name, match_col, match_val):
-    """Hàm xoá dữ liệu chuẩn xác - Ép buộc thực thi"""
-    try: 
-        supabase.table(table_name).delete().eq(match_col, match_val).execute()
-        return True
-    except: 
-        return False
-
-def login_user(username, password):
-    df = run_query("users", filter_col="username", filter_val=username)
-    if not df.empty:
-        user = df.iloc[0]
-        if user['username'] != 'admin' and not bool(user.get('is_active', False)):
-            return "LOCKED" 
-        try:
-            if bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')): return user.to_dict()
-        except:
-            if password == user['password_hash']: return user.to_dict()
-    return None
-
-def register_user(u, p, n, e, package_info):
-    check = run_query("users", select="id", filter_col="username", filter_val=u)
-    if not check.empty: return False, "Tên đăng nhập đã tồn tại"
-    hashed = bcrypt.hashpw(p.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-    full_name_info = f"{n} ({package_info})"
-    now_iso = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    ok, msg = insert_data("users", {
-        "username": u, "password_hash": hashed, "full_name": full_name_info, 
-        "email": e, "expiry_date": None, "is_active": False,
-        "created_at": now_iso, "note": ""
-    })
-    return ok, ""
-
-def parse_revenue_logic(full_name):
-    """Xử lý an toàn: Không có thông tin gói vẫn chạy được"""
-    if not full_name or not isinstance(full_name, str): 
-        return 0, "Dữ liệu cũ", 0
-    if "1 Tháng" in full_name: return 200000, "1 Tháng", 1
-    if "3 Tháng" in full_name: return 500000, "3 Tháng", 3
-    if "6 Tháng" in full_name: return 900000, "6 Tháng", 6
-    if "1 Năm" in full_name: return 1500000, "1 Năm", 12
-    return 0, "Dữ liệu cũ", 0
-
-# --- FORMULAS (GIỮ NGUYÊN) ---
-JP_FORMULAS = {'Nam': {'Bulking': {'Light': {'train': {'p': 3.71, 'c': 4.78, 'f': 0.58}, 'rest': {'p': 3.25, 'c': 2.78, 'f': 1.44}}, 'Moderate': {'train': {'p': 4.07, 'c': 5.23, 'f': 0.35}, 'rest': {'p': 3.10, 'c': 3.10, 'f': 1.83}}, 'High': {'train': {'p': 4.25, 'c': 5.60, 'f': 0.50}, 'rest': {'p': 3.30, 'c': 3.50, 'f': 1.90}}}, 'Maintain': {'Light': {'train': {'p': 3.10, 'c': 3.98, 'f': 0.67}, 'rest': {'p': 3.10, 'c': 1.35, 'f': 0.94}}, 'Moderate': {'train': {'p': 3.38, 'c': 4.37, 'f': 0.85}, 'rest': {'p': 3.00, 'c': 2.58, 'f': 1.33}}, 'High': {'train': {'p': 3.60, 'c': 4.80, 'f': 1.00}, 'rest': {'p': 3.20, 'c': 3.00, 'f': 1.50}}}, 'Cutting': {'Light': {'train': {'p': 2.48, 'c': 3.18, 'f': 0.63}, 'rest': {'p': 2.78, 'c': 1.23, 'f': 0.96}}, 'Moderate': {'train': {'p': 2.71, 'c': 3.01, 'f': 0.70}, 'rest': {'p': 2.74, 'c': 2.05, 'f': 0.92}}, 'High': {'train': {'p': 2.90, 'c': 3.40, 'f': 0.80}, 'rest': {'p': 2.90, 'c': 2.30, 'f': 1.10}}}}, 'Nữ': {'Bulking': {'Light': {'train': {'p': 2.40, 'c': 3.50, 'f': 0.80}, 'rest': {'p': 2.40, 'c': 2.00, 'f': 1.00}}, 'Moderate': {'train': {'p': 2.60, 'c': 4.00, 'f': 0.70}, 'rest': {'p': 2.50, 'c': 2.50, 'f': 1.10}}, 'High': {'train': {'p': 2.80, 'c': 4.50, 'f': 0.80}, 'rest': {'p': 2.60, 'c': 3.00, 'f': 1.20}}}, 'Maintain': {'Light': {'train': {'p': 2.20, 'c': 3.00, 'f': 0.90}, 'rest': {'p': 2.20, 'c': 1.50, 'f': 1.00}}, 'Moderate': {'train': {'p': 2.40, 'c': 3.50, 'f': 0.85}, 'rest': {'p': 2.30, 'c': 2.00, 'f': 1.10}}, 'High': {'train': {'p': 2.50, 'c': 4.00, 'f': 1.00}, 'rest': {'p': 2.40, 'c': 2.50, 'f': 1.20}}}, 'Cutting': {'Light': {'train': {'p': 2.20, 'c': 2.00, 'f': 0.70}, 'rest': {'p': 2.20, 'c': 0.80, 'f': 0.90}}, 'Moderate': {'train': {'p': 2.40, 'c': 2.50, 'f': 0.70}, 'rest': {'p': 2.40, 'c': 1.20, 'f': 0.90}}, 'High': {'train': {'p': 2.50, 'c': 3.00, 'f': 0.80}, 'rest': {'p': 2.50, 'c': 1.50, 'f': 1.00}}}}}
-
-def calc_basic(w, h, a, g, act, goal):
-    if w == 0 or h == 0: return 0, 0, 0, 0
-    bmr = 10*w + 6.25*h - 5*a + 5 if g=='Nam' else 10*w + 6.25*h - 5*a - 161
-    act_map = {'Light':1.375, 'Moderate':1.55, 'High':1.725}
-    tdee = bmr * act_map.get(act, 1.375)
-    target = tdee + 400 if "Tăng" in goal else (tdee if "Cải thiện" in goal else tdee - 400)
-    p, c, f = (target*0.3)/4, (target*0.4)/4, (target*0.3)/9
-    return int(target), int(p), int(c), int(f)
-
-def make_meal_df(p, c, f, type_day):
-    if type_day == 'train': data = [["Bữa 1 (Sáng)", 0, int(p*0.17), int(f*0.4), ""], ["Bữa 2 (Phụ)", int(c*0.25), int(p*0.16), 0, ""], ["PRE-WORKOUT", int(c*0.15), int(p*0.17), int(f*0.3), ""], ["POST-WORKOUT", int(c*0.45), int(p*0.17), 0, ""], ["Bữa 5", int(c*0.15), int(p*0.17), int(f*0.3), ""], ["Bữa 6", 0, int(p*0.16), 0, ""]]
-    else: data = [["Bữa 1", 0, int(p*0.16), int(f*0.25), ""], ["Bữa 2", int(c*0.25), int(p*0.16), int(f*0.15), ""], ["Bữa 3", int(c*0.25), int(p*0.17), int(f*0.15), ""], ["Bữa 4", int(c*0.25), int(p*0.17), int(f*0.15), ""], ["Bữa 5", int(c*0.25), int(p*0.17), int(f*0.15), ""], ["Bữa 6", 0, int(p*0.17), int(f*0.15), ""]]
-    return pd.DataFrame(data, columns=["BỮA", "CARB (g)", "PRO (g)", "FAT (g)", "GỢI Ý"])
-
-def draw_donut(p, c, f, cal):
-    fig = px.pie(values=[p*4, c*4, f*9], names=['Pro', 'Carb', 'Fat'], hole=.65, color_discrete_sequence=['#00BFFF', '#FF4500', '#FFD700'])
-    fig.update_layout(showlegend=False, margin=dict(t=0,b=0,l=0,r=0), height=150, paper_bgcolor='rgba(0,0,0,0)', annotations=[dict(text=f"<span style='font-size:24px; color:#FFF; font-weight:bold; font-family:Teko'>{cal}</span>", x=0.5, y=0.5, font_size=20, showarrow=False)])
-    return fig
-
-# ==========================================
-# 3. CSS GIAO DIỆN
-# ==========================================
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Teko:wght@300;500;700&family=Montserrat:wght@400;600;800&display=swap');
-    .stApp { background: radial-gradient(circle at 50% 10%, #1a0505 0%, #000000 90%); color: #E0E0E0; font-family: 'Montserrat', sans-serif; }
-    .main-logo { font-family: 'Teko', sans-serif; font-size: 70px; font-weight: 700; text-align: center; background: linear-gradient(180deg, #FFD700 10%, #B8860B 60%, #8B6914 100%); -webkit-background-clip: text; -webkit-text-fill-color: transparent; text-transform: uppercase; letter-spacing: 4px; margin-bottom: 5px; filter: drop-shadow(0px 2px 0px #000); }
-    div[data-baseweb="input"], div[data-baseweb="select"] > div { background-color: #F5F5F5 !important; border: 1px solid #D1D1D1 !important; border-radius: 8px !important; color: #111 !important; }
-    input[class*="st-"], div[data-baseweb="select"] span { color: #111 !important; font-weight: 600; }
-    .css-card { background-color: rgba(20, 20, 20, 0.6); backdrop-filter: blur(10px); border: 1px solid #222; border-left: 3px solid #D4AF37; border-radius: 10px; padding: 20px; margin-bottom: 20px; box-shadow: 0 4px 20px rgba(0,0,0,0.4); }
-    .stButton > button { background: linear-gradient(90deg, #8B0000 0%, #C00000 100%); color: white; font-family: 'Teko', sans-serif; font-size: 22px; width: 100%; transition: 0.3s; }
-    .stButton > button:hover { background: linear-gradient(90deg, #C00000 0%, #FF0000 100%); box-shadow: 0 4px 15px rgba(255, 0, 0, 0.4); }
-    section[data-testid="stSidebar"] { background-color: #080808; border-right: 1px solid #222; }
-    section[data-testid="stSidebar"] * { color: #EEE !important; }
-    div[data-testid="stTable"] th { background-color: #D4AF37 !important; color: #000000 !important; font-family: 'Teko', sans-serif !important; }
-    div[data-testid="stTable"] td { background-color: #222 !important; color: #FFFFFF !important; border-bottom: 1px solid #444 !important; }
-    div[role="radiogroup"] label { border: 1px solid #444; padding: 10px; border-radius: 5px; background: #222; margin-bottom: 5px; }
-    div[role="radiogroup"] label[data-checked="true"] { border-color: #D4AF37; background: #333; }
-</style>
-""", unsafe_allow_html=True)
-
-# ==========================================
-# 4. LUỒNG CHÍNH
-# ==========================================
-if 'logged_in' not in st.session_state:
-    st.session_state.logged_in = False
-    st.session_state.user_info = None
-
-# --- MÀN HÌNH ĐĂNG NHẬP & ĐĂNG KÝ ---
-if not st.session_state.logged_in:
-    st.markdown("<div class='main-logo'>LD PRO COACH</div>", unsafe_allow_html=True)
-    c1, c2, c3 = st.columns([1, 1.5, 1])
-    with c2:
-        tab1, tab2 = st.tabs(["ĐĂNG NHẬP", "ĐĂNG KÝ GÓI"])
-        with tab1:
-            with st.form("login"):
-                u = st.text_input("Username"); p = st.text_input("Password", type="password")
-                if st.form_submit_button("🚀 ĐĂNG NHẬP", type="primary", use_container_width=True):
-                    res = login_user(u, p)
-                    if isinstance(res, str) and res == "LOCKED": st.warning("🔒 Chờ duyệt!")
-                    elif res: st.session_state.logged_in = True; st.session_state.user_info = res; st.rerun()
-                    else: st.error("Sai thông tin!")
-        with tab2:
-            if 'reg_step' not in st.session_state: st.session_state.reg_step = 1
-            if st.session_state.reg_step == 1:
-                st.markdown("##### 1. THÔNG TIN CÁ NHÂN")
-                nu = st.text_input("Tên đăng nhập", key="r_u"); np = st.text_input("Mật khẩu", type="password", key="r_p")
-                nn = st.text_input("Họ tên", key="r_n"); ne = st.text_input("Email", key="r_e")
-                if st.button("TIẾP THEO ➡️", use_container_width=True):
-                    if nu and np and nn and ne: st.session_state.saved_u = nu; st.session_state.saved_p = np; st.session_state.saved_n = nn; st.session_state.saved_e = ne; st.session_state.reg_step = 2; st.rerun()
-                    else: st.warning("Điền đủ thông tin!")
-            elif st.session_state.reg_step == 2:
-                st.markdown("##### 2. CHỌN GÓI")
-                packages = {"1 Tháng": 200000, "3 Tháng": 500000, "6 Tháng": 900000, "1 Năm (VIP)": 1500000}
-                pkg_choice = st.radio("Chọn gói phù hợp:", list(packages.keys()))
-                st.metric("THANH TOÁN:", f"{packages[pkg_choice]:,} VNĐ")
-                c1, c2 = st.columns(2)
-                if c1.button("⬅️ QUAY LẠI"): st.session_state.reg_step = 1; st.rerun()
-                if c2.button("XÁC NHẬN ➡️", type="primary"):
-                    ok, msg = register_user(st.session_state.saved_u, st.session_state.saved_p, st.session_state.saved_n, st.session_state.saved_e, pkg_choice)
-                    if ok:
-                        st.session_state.final_money = packages[pkg_choice]; st.session_state.reg_step = 3
-                        try: send_telegram(f"💰 KHÁCH MỚI: {st.session_state.saved_u} | {pkg_choice}")
-                        except: pass
-                        st.rerun()
-                    else: st.error(msg)
-            elif st.session_state.reg_step == 3:
-                try: bank_id = st.secrets["bank"]["id"]; acc_no = st.secrets["bank"]["account_no"]; acc_name = st.secrets["bank"]["account_name"]
-                except: bank_id = "MB"; acc_no = "0000000000"; acc_name = "DEMO"
-                amount = st.session_state.final_money; content = f"KICH HOAT {st.session_state.saved_u}"
-                qr_url = f"https://img.vietqr.io/image/{bank_id}-{acc_no}-compact.jpg?amount={amount}&addInfo={content}&accountName={acc_name}"
-                st.success("ĐĂNG KÝ THÀNH CÔNG!"); st.image(qr_url, caption="Quét mã thanh toán", width=300)
-                st.info("⚡ Chờ 1-5 phút hệ thống kích hoạt."); 
-                if st.button("VỀ TRANG CHỦ"): st.session_state.reg_step = 1; st.rerun()
-
-else:
-    user = st.session_state.user_info
-    TRAINER_ID = int(user['id'])
-    IS_ADMIN = (user['username'] == 'admin')
-    
-    default_inputs = {"name_in":"", "phone_in":"", "age_in":0, "height_in":0, "weight_in":0.0, "bf_in":0.0, "pkg_in":"", "dur_in":1, "price_in":0, "gender_in":"Nam", "act_in":"Light", "goal_in":"Tăng cân", "level_in":"🔰 Beginner / Intermediate"}
-    for k,v in default_inputs.items():
-        if k not in st.session_state: st.session_state[k] = v
-
-    with st.sidebar:
-        st.image("https://cdn-icons-png.flaticon.com/512/8847/8847419.png", width=80)
-        st.markdown(f"### 👤 {user['full_name']}")
-        if IS_ADMIN: st.info("🔰 DOANH CHỦ SAAS")
-        else:
-            if user['expiry_date']:
-                days = (pd.to_datetime(user['expiry_date']) - datetime.now()).days
-                st.caption(f"⏳ Hạn dùng: {days} ngày" if days > 0 else "⚠️ Đã hết hạn")
-            else: st.warning("Chưa kích hoạt")
-        
-        st.markdown("---")
-        if IS_ADMIN: menu = st.radio("QUẢN TRỊ", ["📊 DOANH CHỦ DASHBOARD", "🔧 QUẢN LÝ USER", "💵 TÀI CHÍNH (HLV)", "👥 HỌC VIÊN (HLV)", "➕ THÊM MỚI"])
-        else: menu = st.radio("MENU", ["🏠 TỔNG QUAN", "👥 HỌC VIÊN", "➕ THÊM MỚI", "💵 TÀI CHÍNH"])
-        if st.button("Đăng xuất"): st.session_state.logged_in = False; st.rerun()
-
-    # =========================================================================
-    # 📊 DASHBOARD SAAS (V59 - FIXED ANALYTICS)
-    # =========================================================================
-    if menu == "📊 DOANH CHỦ DASHBOARD" and IS_ADMIN:
-        st.markdown(f"<div class='main-logo'>DOANH SỐ & TĂNG TRƯỞNG</div>", unsafe_allow_html=True)
-        raw_users = run_query("users")
-        if not raw_users.empty:
-            df_users = raw_users[raw_users['username'] != 'admin'].copy()
-            
-            def process_smart_data(row):
-                money, pk_name, months = parse_revenue_logic(row['full_name'])
-                if 'created_at' in row and row['created_at'] and pd.notna(row['created_at']): start = pd.to_datetime(row['created_at'])
-                elif row['expiry_date']: start = pd.to_datetime(row['expiry_date']) - timedelta(days=months*30)
-                else: start = datetime.now()
-                return money, pk_name, start
-
-            if not df_users.empty:
-                computed = df_users.apply(process_smart_data, axis=1, result_type='expand')
-                df_users['Revenue'], df_users['Package'], df_users['Start_Date'] = computed[0], computed[1], computed[2]
-                df_users['Month_Sort'] = df_users['Start_Date'].dt.strftime('%Y-%m')
-
-                tab1, tab2, tab3, tab4, tab5 = st.tabs(["🏠 TỔNG QUAN", "📅 BÁO CÁO THÁNG", "📦 HIỆU QUẢ GÓI", "🎯 MỤC TIÊU", "📄 DỮ LIỆU GỐC"])
-
-                with tab1:
-                    rev_today = df_users[df_users['Start_Date'].dt.date == datetime.now().date()]['Revenue'].sum()
-                    st.metric("HÔM NAY", f"{rev_today:,.0f} đ"); st.divider()
-                    df_trend = df_users.groupby(df_users['Start_Date'].dt.date)['Revenue'].sum().reset_index()
-                    st.plotly_chart(px.bar(df_trend, x='Start_Date', y='Revenue', color_discrete_sequence=['#FFD700']), use_container_width=True)
-
-                with tab2:
-                    current_year = datetime.now().year
-                    for m in range(1, 13):
-                        m_key = f"{current_year}-{m:02d}"
-                        df_m = df_users[df_users['Month_Sort'] == m_key].copy()
-                        total_m = df_m['Revenue'].sum()
-                        with st.expander(f"📁 Tháng {m:02d} - {total_m:,.0f} VNĐ"):
-                            if not df_m.empty:
-                                df_m = df_m.sort_values(by='Start_Date')
-                                df_detail = df_m[['Start_Date', 'full_name', 'Package', 'Revenue']].copy()
-                                df_detail['Ngày'] = df_detail['Start_Date'].dt.strftime('%d/%m')
-                                df_detail['Giờ'] = df_detail['Start_Date'].dt.strftime('%H:%M')
-                                df_detail['Số Tiền'] = df_detail['Revenue'].apply(lambda x: f"{x:,.0f}")
-                                st.dataframe(df_detail[['Ngày', 'Giờ', 'full_name', 'Package', 'Số Tiền']], use_container_width=True, hide_index=True)
-                            else: st.info("Trống.")
-
-                with tab5: # DỮ LIỆU GỐC
-                    col_f, col_d = st.columns([3, 1])
-                    sel_f = col_f.selectbox("📅 Lọc:", ["Tất cả"] + [f"Tháng {i}" for i in range(1, 13)])
-                    df_ex = df_users[['Start_Date', 'username', 'full_name', 'Package', 'Revenue', 'Month_Sort']].copy()
-                    if sel_f != "Tất cả":
-                        df_ex = df_ex[df_ex['Month_Sort'] == f"{datetime.now().year}-{int(sel_f.split(' ')[1]):02d}"]
-                    df_ex['Start_Date'] = df_ex['Start_Date'].dt.strftime('%Y-%m-%d')
-                    st.dataframe(df_ex[['Start_Date', 'username', 'full_name', 'Package', 'Revenue']], use_container_width=True, hide_index=True)
-            else: st.info("Trống.")
-        else: st.info("Database trống.")
-
-    # =========================================================================
-    # 🔧 QUẢN LÝ USER (V59 - SMART SYNC FIXED)
-    # =========================================================================
-    elif menu == "🔧 QUẢN LÝ USER" and IS_ADMIN:
-        st.markdown(f"<div class='main-logo'>QUẢN LÝ USER</div>", unsafe_allow_html=True)
-        raw = run_query("users")
-        if not raw.empty:
-            df = raw[raw['username'] != 'admin'].copy()
-            if 'note' not in df.columns: df['note'] = "" 
-            c_table, c_edit = st.columns([1.5, 1])
-            with c_table:
-                st.subheader("Danh sách User")
-                event = st.dataframe(df[['username', 'full_name', 'is_active', 'note']], use_container_width=True, height=500, selection_mode="single-row", on_select="rerun")
-            with c_edit:
-                st.subheader("🛠️ Chỉnh sửa / Xóa")
-                if event.selection.rows:
-                    idx = event.selection.rows[0]; user_data = df.iloc[idx]; sel_u = user_data['username']
-                    st.info(f"Đang chọn: **{sel_u}**")
-                    with st.form("edit_form_v59"):
-                        new_name = st.text_input("Họ tên & Gói:", value=str(user_data['full_name']))
-                        new_note = st.text_area("Ghi chú (Note):", value=str(user_data['note']) if pd.notna(user_data['note']) else "")
-                        curr_exp = user_data['expiry_date']
-                        new_exp = st.date_input("Hạn dùng:", value=pd.to_datetime(curr_exp) if pd.notna(curr_exp) else datetime.now())
-                        new_active = st.checkbox("Active (Đã TT)", value=bool(user_data['is_active']))
-                        c_u, c_d = st.columns(2)
-                        if c_u.form_submit_button("💾 LƯU"):
-                            update_data("users", {"full_name": new_name, "note": new_note, "expiry_date": str(new_exp), "is_active": new_active}, "username", sel_u)
-                            st.success("Xong!"); time.sleep(0.5); st.rerun()
-                        if c_d.form_submit_button("🗑️ XÓA VĨNH VIỄN", type="primary"):
-                            with st.spinner("Đang xóa dữ liệu..."):
-                                # LOGIC XÓA ƯU TIÊN: Chạy lệnh xóa thẳng vào DB, bỏ qua các ràng buộc tính toán
-                                if delete_data("users", "username", sel_u):
-                                    st.success(f"Đã xóa {sel_u}!")
-                                    time.sleep(1.5) # Chờ DB xác nhận
-                                    st.rerun()
-                                else: st.error("Lỗi xóa!")
-                else: st.info("👈 Hãy chọn một dòng bên trái.")
-        else: st.info("Trống.")
-
-    # --- CÁC PHẦN KHÁC (HLV...) GIỮ NGUYÊN ---
-    elif (menu == "🏠 TỔNG QUAN") or (menu == "💵 TÀI CHÍNH (HLV)"):
-        st.markdown(f"<div class='main-logo'>DASHBOARD HLV</div>", unsafe_allow_html=True)
-        clients = run_query("clients", filter_col="trainer_id", filter_val=TRAINER_ID)
-        if not clients.empty:
-            k1, k2, k3 = st.columns(3)
-            k1.markdown(f"<div class='css-card' style='text-align:center'><h2>{len(clients)}</h2><p>HỌC VIÊN</p></div>", unsafe_allow_html=True)
-            k2.markdown(f"<div class='css-card' style='text-align:center'><h2>Active</h2><p>TRẠNG THÁI</p></div>", unsafe_allow_html=True)
-            k3.markdown(f"<div class='css-card' style='text-align:center'><h2>{clients['price'].sum():,}</h2><p>DOANH THU</p></div>", unsafe_allow_html=True)
-            st.dataframe(clients, use_container_width=True)
-        else: st.info("Chưa có dữ liệu.")
-
-    elif menu == "👥 HỌC VIÊN (HLV)" or menu == "👥 HỌC VIÊN":
-        clients = run_query("clients", filter_col="trainer_id", filter_val=TRAINER_ID)
-        if not clients.empty:
-            c_sel, _ = st.columns([1,2]); c_name = c_sel.selectbox("CHỌN HỌC VIÊN:", clients['name'].tolist())
-            client = clients[clients['name'] == c_name].iloc[0]; cid = int(client['id'])
-            st.markdown(f"### {client['name']} - {client['level']}")
-            t1, t2, t3, t4 = st.tabs(["MEAL PLAN", "CHECK-IN", "TIẾN ĐỘ", "CÀI ĐẶT"])
-            with t1: st.info("Chế độ ăn hiển thị tại đây")
-            with t2:
-                with st.form("chk"):
-                    d = st.date_input("Ngày"); w = st.number_input("Cân nặng")
-                    if st.form_submit_button("LƯU"): insert_data("checkins", {"trainer_id": TRAINER_ID, "client_id": cid, "date": str(d), "weight": w}); st.rerun()
-                st.dataframe(run_query("checkins", filter_col="client_id", filter_val=cid))
-            with t3:
-                logs = run_query("checkins", filter_col="client_id", filter_val=cid)
-                if not logs.empty: st.plotly_chart(px.line(logs, x='date', y='weight'), use_container_width=True)
-
-    elif menu == "➕ THÊM MỚI":
-        st.markdown("### 📝 HỒ SƠ KHÁCH HÀNG")
-        with st.form("new_c"):
-            n = st.text_input("Họ tên"); p = st.text_input("SĐT"); g = st.selectbox("Giới tính", ["Nam", "Nữ"])
-            h = st.number_input("Cao (cm)"); w = st.number_input("Nặng (kg)"); pkg = st.text_input("Gói"); pr = st.number_input("Giá")
-            if st.form_submit_button("LƯU HỒ SƠ"):
-                insert_data("clients", {"trainer_id": TRAINER_ID, "name": n, "phone": p, "gender": g, "height": h, "start_weight": w, "package_name": pkg, "price": pr, "start_date": datetime.now().strftime('%Y-%m-%d'), "status": "Active"})
-                st.success("Đã lưu!"); st.rerun()
+import atexit
+import os
+import shutil
+import tempfile
+import time
+_RERUN_T0 = time.perf_counter()
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+from db import get_client, build_query, fetch_pages, bulk_update
+from query_cache import QueryCache
+from perf import PerfRecorder
+from auth import AUTH_COLS, Authenticator, RevocationStore, SessionTokens, load_or_create_secret
+from notifier import TelegramNotifier
+from rollup_store import RevenueRollupStore
+from analytics import build_revenue_frame
+from bulk_io import bulk_import, export_table
+from lifecycle import LifecycleSweeper, USER_COLS, apply_plan, extend_groups, run_sweep
+from checkin_store import CheckinSeriesStore, downsample
+
+# ==========================================
+# 1. CẤU HÌNH & KẾT NỐI (V59 - BUG FIX DELETE)
+# ==========================================
+st.set_page_config(page_title="LD PRO COACH - System", layout="wide", page_icon="🦁")
+
+# --- KẾT NỐI SUPABASE ---
+try:
+    SUPABASE_URL = st.secrets["supabase"]["URL"]
+    SUPABASE_KEY = st.secrets["supabase"]["KEY"]
+    supabase = get_client(SUPABASE_URL, SUPABASE_KEY)
+except Exception as e:
+    st.error("❌ Lỗi cấu hình Secrets."); st.stop()
+
+@st.cache_resource
+def get_query_cache():
+    """Cache dùng chung cho mọi session/rerun trong process"""
+    return QueryCache(max_entries=256, ttl=60.0)
+
+query_cache = get_query_cache()
+
+@st.cache_resource
+def get_perf():
+    """Ring buffer span hiệu năng dùng chung cho process (xem ở trang ⏱️ PERFORMANCE)"""
+    return PerfRecorder(maxlen=5000)
+
+perf = get_perf()
+perf.set_page(None)
+
+@st.cache_resource
+def get_rollup_store():
+    """Bảng tổng hợp doanh thu (SQLite cục bộ) dùng chung cho cả process"""
+    try: path = st.secrets["rollups"]["path"]
+    except Exception: path = "revenue_rollups.db"
+    return RevenueRollupStore(path)
+
+try: ROLLUP_RECONCILE_HOURS = float(st.secrets["rollups"]["reconcile_hours"])
+except Exception: ROLLUP_RECONCILE_HOURS = 6.0
+
+rollups = get_rollup_store()
+
+def fetch_checkins(client_id, since):
+    """Check-in của một học viên, chỉ các dòng có date >= since (None = toàn bộ)"""
+    try:
+        with perf.span("query", "checkins_since", "checkins"): return pd.DataFrame(build_query(supabase, "checkins", filter_col="client_id", filter_val=client_id, filters=[("date", "gte", since)], order_by=("date", 'asc')).execute().data)
+    except: return pd.DataFrame()
+
+@st.cache_resource
+def get_checkin_store():
+    """Chuỗi check-in theo học viên dùng chung cho mọi session - tải một lần rồi chỉ lấy phần mới"""
+    return CheckinSeriesStore(fetch_checkins)
+
+checkin_store = get_checkin_store()
+
+# ==========================================
+# 2. HÀM XỬ LÝ (CORE LOGIC)
+# ==========================================
+
+@st.cache_resource
+def get_notifier():
+    """Worker Telegram nền dùng chung cho cả process (None nếu chưa cấu hình)"""
+    try: cfg = st.secrets["telegram"]; token, chat_id = cfg["bot_token"], cfg["chat_id"]
+    except Exception: return None
+    notifier = TelegramNotifier(token, chat_id, base_url=cfg.get("base_url", "https://api.telegram.org"), spool_path=cfg.get("spool_path", "telegram_spool.jsonl")).start()
+    atexit.register(notifier.stop)  # tin còn trong hàng đợi / đang gom được spool thay vì mất khi tắt process
+    return notifier
+
+def send_telegram(message):
+    """Không chặn: đưa vào hàng đợi, worker nền gom tin + retry + spool khi lỗi"""
+    notifier = get_notifier()
+    return notifier.notify(message) if notifier else False
+
+def run_query(table_name, select="*", order_by=None, filter_col=None, filter_val=None, filters=None, limit=None, after=None):
+    """filters: [(cột, op, giá trị)] op ∈ eq/neq/gt/gte/lt/lte; after: (cột, giá trị) cho keyset pagination"""
+    key = QueryCache.make_key(table_name, select, filter_col, filter_val, order_by, filters, limit, after)
+    cached = query_cache.get(key)
+    if cached is not None: return cached.copy()
+    gen = query_cache.generation(table_name)
+    try:
+        with perf.span("query", "select", table_name): df = pd.DataFrame(build_query(supabase, table_name, select, filter_col, filter_val, filters, order_by, limit, after).execute().data)
+    except: return pd.DataFrame()
+    query_cache.put(key, df, gen)
+    return df.copy()
+
+def iter_query(table_name, select="*", filters=None, key_col="id", page_size=1000):
+    """Stream từng trang DataFrame (không qua cache) - dùng cho xuất dữ liệu / xử lý bảng lớn"""
+    for rows in fetch_pages(supabase, table_name, select, filters, key_col, page_size): yield pd.DataFrame(rows)
+
+def paged_query(state_key, table_name, select, filters=None, key_col="id", page_size=50):
+    """Một trang theo keyset + nút Trước/Sau; con trỏ lưu trong session_state, reset khi bộ lọc đổi"""
+    sig = repr(filters)
+    if st.session_state.get(f"{state_key}_sig") != sig: st.session_state[state_key] = [None]; st.session_state[f"{state_key}_sig"] = sig
+    cursors = st.session_state[state_key]
+    df = run_query(table_name, select=select, filters=filters, order_by=(key_col, 'asc'), limit=page_size, after=(key_col, cursors[-1]))
+    c_prev, c_page, c_next = st.columns([1, 2, 1])
+    if c_prev.button("◀ Trước", key=f"{state_key}_prev", disabled=len(cursors) == 1): cursors.pop(); st.rerun()
+    c_page.caption(f"Trang {len(cursors)} · {len(df)} dòng")
+    if c_next.button("Sau ▶", key=f"{state_key}_next", disabled=len(df) < page_size):
+        last = df[key_col].iloc[-1]; cursors.append(last.item() if hasattr(last, 'item') else last); st.rerun()
+    return df
+
+EXPORT_TTL = 3600  # giây; file xuất tạm cũ hơn bị dọn ở lần xuất kế tiếp
+
+@st.cache_resource
+def get_export_dir():
+    """Thư mục file xuất tạm của process - xoá toàn bộ khi process dừng"""
+    path = tempfile.mkdtemp(prefix="ld_export_"); atexit.register(shutil.rmtree, path, True)
+    return path
+
+def prune_exports(export_dir):
+    """Streamlit không có hook kết thúc session: dọn các file của session đã bỏ đi theo tuổi"""
+    for name in os.listdir(export_dir):
+        path = os.path.join(export_dir, name)
+        try:
+            if time.time() - os.path.getmtime(path) > EXPORT_TTL: os.remove(path)
+        except OSError: pass
+
+def export_button(col, label, state_key, table_name, select="*", filters=None):
+    """Xuất bảng theo từng trang ra file tạm (không dựng cả bảng trong RAM), sau đó hiện nút tải"""
+    sig = repr((table_name, select, filters))
+    prev = st.session_state.get(state_key)
+    if prev and prev[0] == sig and os.path.exists(prev[1]):
+        with open(prev[1], "rb") as f: col.download_button("⬇️ TẢI CSV", f, file_name=f"{table_name}.csv", mime="text/csv", key=f"{state_key}_dl")
+    elif col.button(label, key=f"{state_key}_prep"):
+        export_dir = get_export_dir(); prune_exports(export_dir)
+        fd, path = tempfile.mkstemp(prefix=f"{table_name}_", suffix=".csv", dir=export_dir); os.close(fd)
+        if prev and os.path.exists(prev[1]): os.remove(prev[1])
+        export_table(supabase, table_name, path, select=select, filters=filters)
+        st.session_state[state_key] = (sig, path); st.rerun()
+
+def sync_rollups(table_name, rows, deleted=False):
+    """Cập nhật bucket doanh thu bị ảnh hưởng bởi một lần ghi vào bảng users"""
+    if table_name != "users" or not rows: return
+    try:
+        if deleted: rollups.remove_users([r['username'] for r in rows if r.get('username')])
+        else: rollups.apply_users(pd.DataFrame(rows))
+    except Exception: pass
+
+def fetch_users_since(watermark):
+    """Đồng bộ bù theo trang keyset (id): các user có created_at >= watermark (None = toàn bộ, dùng khi đối soát).
+
+    Không giới hạn bởi max-rows của PostgREST; dòng cùng timestamp ở biên được áp lại (upsert) thay vì bị bỏ sót.
+    """
+    pages = fetch_pages(supabase, "users", "username,full_name,created_at,expiry_date", filters=[(rollups.watermark_col, "gte", watermark)])
+    while True:
+        with perf.span("query", "users_since", "users"): rows = next(pages, None)
+        if rows is None: return
+        yield pd.DataFrame(rows)
+
+def insert_data(table_name, data_dict):
+    try:
+        with perf.span("write", "insert", table_name): res = supabase.table(table_name).insert(data_dict).execute()
+        sync_rollups(table_name, res.data or [data_dict]); return True, ""
+    except Exception as e: return False, str(e)
+    finally: query_cache.invalidate(table_name)
+
+def update_data(table_name, update_dict, match_col, match_val):
+    try:
+        with perf.span("write", "update", table_name): res = supabase.table(table_name).update(update_dict).eq(match_col, match_val).execute()
+        sync_rollups(table_name, res.data); return True
+    except: return False
+    finally: query_cache.invalidate(table_name)
+
+def bulk_update_data(table_name, update_dict, match_col, match_vals):
+    """Cùng một update cho nhiều dòng trong một round-trip (`in_`); trả list dòng đã cập nhật"""
+    try:
+        with perf.span("write", "bulk_update", table_name, rows=len(match_vals)): rows = bulk_update(supabase, table_name, update_dict, match_col, match_vals)
+        sync_rollups(table_name, rows); return rows
+    except: return []
+    finally: query_cache.invalidate(table_name)
+
+def delete_data(table_name, match_col, match_val):
+    """Hàm xoá dữ liệu chuẩn xác - Ép buộc thực thi"""
+    try: 
+        with perf.span("write", "delete", table_name): res = supabase.table(table_name).delete().eq(match_col, match_val).execute()
+        sync_rollups(table_name, res.data or ([{match_col: match_val}] if match_col == "username" else []), deleted=True)
+        return True
+    except: 
+        return False
+    finally: query_cache.invalidate(table_name)
+
+PROFILE_COLS = "id,username,full_name,email,expiry_date,is_active"
+
+def auth_lookup(username):
+    df = run_query("users", select=AUTH_COLS, filter_col="username", filter_val=username)
+    return None if df.empty else {k: (v.item() if hasattr(v, 'item') else v) for k, v in df.iloc[0].items()}
+
+@st.cache_resource
+def get_authenticator():
+    """bcrypt trên pool riêng + throttle + token phiên, dùng chung cho mọi session.
+
+    Secret: `[auth] secret` (bắt buộc khi chạy nhiều replica), không có thì sinh ngẫu nhiên và lưu ở secret_path.
+    """
+    try: cfg = st.secrets["auth"]
+    except Exception: cfg = {}
+    secret = cfg.get("secret") or load_or_create_secret(cfg.get("secret_path", "session_secret.key"))
+    tokens = SessionTokens(secret, ttl=float(cfg.get("session_ttl", 12 * 3600)), revoked=RevocationStore(cfg.get("revoked_path", "revoked_sessions.db")))
+    return Authenticator(auth_lookup, lambda uid, h: update_data("users", {"password_hash": h}, "id", uid), secret, tokens=tokens, perf=perf)
+
+authenticator = get_authenticator()
+
+def load_profile(user_id):
+    df = run_query("users", select=PROFILE_COLS, filter_col="id", filter_val=int(user_id))
+    return None if df.empty else df.iloc[0].to_dict()
+
+def sweep_kwargs():
+    """Tham số quét vòng đời gói: đọc user theo trang, ghi bằng bulk_update_data"""
+    try: cfg = st.secrets["lifecycle"]
+    except Exception: cfg = {}
+    fetch = lambda: pd.concat(list(iter_query("users", USER_COLS)) or [pd.DataFrame(columns=USER_COLS.split(","))], ignore_index=True)
+    return {"fetch_users": fetch, "update": lambda changes, names: bulk_update_data("users", changes, "username", names),
+            "transactions_path": cfg.get("transactions"), "state_path": cfg.get("state_path", "lifecycle_state.json")}
+
+@st.cache_resource
+def get_lifecycle_sweeper():
+    """Thread nền quét gói định kỳ - chỉ bật khi secrets có [lifecycle] interval > 0"""
+    try: interval = float(st.secrets["lifecycle"]["interval"])
+    except Exception: return None
+    return LifecycleSweeper(interval, **sweep_kwargs()).start() if interval > 0 else None
+
+def login_user(username, password):
+    """dict profile khi đúng, hoặc chuỗi trạng thái LOCKED / THROTTLED / BUSY, hoặc None"""
+    with perf.span("auth", "login", "users"): status, user, token = authenticator.login(username, password)
+    if status != "OK": return None if status == "INVALID" else status
+    st.query_params["s"] = token
+    return {**user, **(load_profile(user['id']) or {})}
+
+def register_user(u, p, n, e, package_info):
+    check = run_query("users", select="id", filter_col="username", filter_val=u)
+    if not check.empty: return False, "Tên đăng nhập đã tồn tại"
+    try:
+        hashed = authenticator.hash_password(p)
+    except RuntimeError as e: return False, str(e)
+    full_name_info = f"{n} ({package_info})"
+    now_iso = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    ok, msg = insert_data("users", {
+        "username": u, "password_hash": hashed, "full_name": full_name_info, 
+        "email": e, "expiry_date": None, "is_active": False,
+        "created_at": now_iso, "note": ""
+    })
+    return ok, ""
+
+def draw_donut(p, c, f, cal):
+    import plotly.express as px
+    fig = px.pie(values=[p*4, c*4, f*9], names=['Pro', 'Carb', 'Fat'], hole=.65, color_discrete_sequence=['#00BFFF', '#FF4500', '#FFD700'])
+    fig.update_layout(showlegend=False, margin=dict(t=0,b=0,l=0,r=0), height=150, paper_bgcolor='rgba(0,0,0,0)', annotations=[dict(text=f"<span style='font-size:24px; color:#FFF; font-weight:bold; font-family:Teko'>{cal}</span>", x=0.5, y=0.5, font_size=20, showarrow=False)])
+    return fig
+
+# ==========================================
+# 3. CSS GIAO DIỆN
+# ==========================================
+st.markdown("""
+<style>
+    @import url('https://fonts.googleapis.com/css2?family=Teko:wght@300;500;700&family=Montserrat:wght@400;600;800&display=swap');
+    .stApp { background: radial-gradient(circle at 50% 10%, #1a0505 0%, #000000 90%); color: #E0E0E0; font-family: 'Montserrat', sans-serif; }
+    .main-logo { font-family: 'Teko', sans-serif; font-size: 70px; font-weight: 700; text-align: center; background: linear-gradient(180deg, #FFD700 10%, #B8860B 60%, #8B6914 100%); -webkit-background-clip: text; -webkit-text-fill-color: transparent; text-transform: uppercase; letter-spacing: 4px; margin-bottom: 5px; filter: drop-shadow(0px 2px 0px #000); }
+    div[data-baseweb="input"], div[data-baseweb="select"] > div { background-color: #F5F5F5 !important; border: 1px solid #D1D1D1 !important; border-radius: 8px !important; color: #111 !important; }
+    input[class*="st-"], div[data-baseweb="select"] span { color: #111 !important; font-weight: 600; }
+    .css-card { background-color: rgba(20, 20, 20, 0.6); backdrop-filter: blur(10px); border: 1px solid #222; border-left: 3px solid #D4AF37; border-radius: 10px; padding: 20px; margin-bottom: 20px; box-shadow: 0 4px 20px rgba(0,0,0,0.4); }
+    .stButton > button { background: linear-gradient(90deg, #8B0000 0%, #C00000 100%); color: white; font-family: 'Teko', sans-serif; font-size: 22px; width: 100%; transition: 0.3s; }
+    .stButton > button:hover { background: linear-gradient(90deg, #C00000 0%, #FF0000 100%); box-shadow: 0 4px 15px rgba(255, 0, 0, 0.4); }
+    section[data-testid="stSidebar"] { background-color: #080808; border-right: 1px solid #222; }
+    section[data-testid="stSidebar"] * { color: #EEE !important; }
+    div[data-testid="stTable"] th { background-color: #D4AF37 !important; color: #000000 !important; font-family: 'Teko', sans-serif !important; }
+    div[data-testid="stTable"] td { background-color: #222 !important; color: #FFFFFF !important; border-bottom: 1px solid #444 !important; }
+    div[role="radiogroup"] label { border: 1px solid #444; padding: 10px; border-radius: 5px; background: #222; margin-bottom: 5px; }
+    div[role="radiogroup"] label[data-checked="true"] { border-color: #D4AF37; background: #333; }
+</style>
+""", unsafe_allow_html=True)
+
+# ==========================================
+# 4. LUỒNG CHÍNH
+# ==========================================
+_rerun_end = "ok"
+try:
+    if 'logged_in' not in st.session_state:
+        st.session_state.logged_in = False
+        st.session_state.user_info = None
+        # F5 / mở lại tab: token phiên trong URL -> vào thẳng, không bcrypt
+        uid, token = authenticator.rotate(st.query_params.get("s"))
+        profile = load_profile(uid) if uid else None
+        if profile and (profile['username'] == 'admin' or bool(profile.get('is_active'))):
+            st.session_state.logged_in = True; st.session_state.user_info = profile; st.query_params["s"] = token
+        elif st.query_params.get("s"): st.query_params.pop("s", None); token and authenticator.logout(token)
+
+    # --- MÀN HÌNH ĐĂNG NHẬP & ĐĂNG KÝ ---
+    if not st.session_state.logged_in:
+        perf.set_page("🔑 ĐĂNG NHẬP")
+        with perf.span("section", "🔑 ĐĂNG NHẬP"):
+            st.markdown("<div class='main-logo'>LD PRO COACH</div>", unsafe_allow_html=True)
+            c1, c2, c3 = st.columns([1, 1.5, 1])
+            with c2:
+                tab1, tab2 = st.tabs(["ĐĂNG NHẬP", "ĐĂNG KÝ GÓI"])
+                with tab1:
+                    with st.form("login"):
+                        u = st.text_input("Username"); p = st.text_input("Password", type="password")
+                        if st.form_submit_button("🚀 ĐĂNG NHẬP", type="primary", use_container_width=True):
+                            res = login_user(u, p)
+                            if isinstance(res, str) and res == "LOCKED": st.warning("🔒 Chờ duyệt!")
+                            elif res == "THROTTLED": st.error("⏳ Sai quá nhiều lần, thử lại sau ít phút.")
+                            elif res == "BUSY": st.warning("⚡ Hệ thống đang bận, thử lại sau giây lát.")
+                            elif res: st.session_state.logged_in = True; st.session_state.user_info = res; st.rerun()
+                            else: st.error("Sai thông tin!")
+                with tab2:
+                    if 'reg_step' not in st.session_state: st.session_state.reg_step = 1
+                    if st.session_state.reg_step == 1:
+                        st.markdown("##### 1. THÔNG TIN CÁ NHÂN")
+                        nu = st.text_input("Tên đăng nhập", key="r_u"); np = st.text_input("Mật khẩu", type="password", key="r_p")
+                        nn = st.text_input("Họ tên", key="r_n"); ne = st.text_input("Email", key="r_e")
+                        if st.button("TIẾP THEO ➡️", use_container_width=True):
+                            if nu and np and nn and ne: st.session_state.saved_u = nu; st.session_state.saved_p = np; st.session_state.saved_n = nn; st.session_state.saved_e = ne; st.session_state.reg_step = 2; st.rerun()
+                            else: st.warning("Điền đủ thông tin!")
+                    elif st.session_state.reg_step == 2:
+                        st.markdown("##### 2. CHỌN GÓI")
+                        packages = {"1 Tháng": 200000, "3 Tháng": 500000, "6 Tháng": 900000, "1 Năm (VIP)": 1500000}
+                        pkg_choice = st.radio("Chọn gói phù hợp:", list(packages.keys()))
+                        st.metric("THANH TOÁN:", f"{packages[pkg_choice]:,} VNĐ")
+                        c1, c2 = st.columns(2)
+                        if c1.button("⬅️ QUAY LẠI"): st.session_state.reg_step = 1; st.rerun()
+                        if c2.button("XÁC NHẬN ➡️", type="primary"):
+                            ok, msg = register_user(st.session_state.saved_u, st.session_state.saved_p, st.session_state.saved_n, st.session_state.saved_e, pkg_choice)
+                            if ok:
+                                st.session_state.final_money = packages[pkg_choice]; st.session_state.reg_step = 3
+                                send_telegram(f"💰 KHÁCH MỚI: {st.session_state.saved_u} | {pkg_choice}")
+                                st.rerun()
+                            else: st.error(msg)
+                    elif st.session_state.reg_step == 3:
+                        try: bank_id = st.secrets["bank"]["id"]; acc_no = st.secrets["bank"]["account_no"]; acc_name = st.secrets["bank"]["account_name"]
+                        except: bank_id = "MB"; acc_no = "0000000000"; acc_name = "DEMO"
+                        amount = st.session_state.final_money; content = f"KICH HOAT {st.session_state.saved_u}"
+                        qr_url = f"https://img.vietqr.io/image/{bank_id}-{acc_no}-compact.jpg?amount={amount}&addInfo={content}&accountName={acc_name}"
+                        st.success("ĐĂNG KÝ THÀNH CÔNG!"); st.image(qr_url, caption="Quét mã thanh toán", width=300)
+                        st.info("⚡ Chờ 1-5 phút hệ thống kích hoạt."); 
+                        if st.button("VỀ TRANG CHỦ"): st.session_state.reg_step = 1; st.rerun()
+
+    else:
+        user = st.session_state.user_info
+        TRAINER_ID = int(user['id'])
+        IS_ADMIN = (user['username'] == 'admin')
+    
+        default_inputs = {"name_in":"", "phone_in":"", "age_in":0, "height_in":0, "weight_in":0.0, "bf_in":0.0, "pkg_in":"", "dur_in":1, "price_in":0, "gender_in":"Nam", "act_in":"Light", "goal_in":"Tăng cân", "level_in":"🔰 Beginner / Intermediate"}
+        for k,v in default_inputs.items():
+            if k not in st.session_state: st.session_state[k] = v
+
+        with st.sidebar:
+            st.image("https://cdn-icons-png.flaticon.com/512/8847/8847419.png", width=80)
+            st.markdown(f"### 👤 {user['full_name']}")
+            if IS_ADMIN:
+                st.info("🔰 DOANH CHỦ SAAS")
+                cs = query_cache.stats()
+                st.caption(f"⚡ Cache: {cs['hits']} hit / {cs['misses']} miss ({cs['hit_rate']:.0%}) · {cs['size']} mục")
+                if 'last_rerun_ms' in st.session_state: st.caption(f"⏱️ Rerun trước: {st.session_state.last_rerun_ms:.0f} ms")
+            else:
+                if user['expiry_date']:
+                    days = (pd.to_datetime(user['expiry_date']) - datetime.now()).days
+                    st.caption(f"⏳ Hạn dùng: {days} ngày" if days > 0 else "⚠️ Đã hết hạn")
+                else: st.warning("Chưa kích hoạt")
+        
+            st.markdown("---")
+            if IS_ADMIN: menu = st.radio("QUẢN TRỊ", ["📊 DOANH CHỦ DASHBOARD", "🔧 QUẢN LÝ USER", "💵 TÀI CHÍNH (HLV)", "👥 HỌC VIÊN (HLV)", "➕ THÊM MỚI", "⏱️ PERFORMANCE"], key="menu")
+            else: menu = st.radio("MENU", ["🏠 TỔNG QUAN", "👥 HỌC VIÊN", "➕ THÊM MỚI", "💵 TÀI CHÍNH"], key="menu")
+            if IS_ADMIN: get_lifecycle_sweeper()
+            if st.button("Đăng xuất"):
+                authenticator.logout(st.query_params.get("s")); st.query_params.pop("s", None)
+                st.session_state.logged_in = False; st.rerun()
+        perf.set_page(menu)
+
+        with perf.span("section", menu):
+            # =========================================================================
+            # 📊 DASHBOARD SAAS (V59 - FIXED ANALYTICS)
+            # =========================================================================
+            if menu == "📊 DOANH CHỦ DASHBOARD" and IS_ADMIN:
+                st.markdown(f"<div class='main-logo'>DOANH SỐ & TĂNG TRƯỞNG</div>", unsafe_allow_html=True)
+                c_sync, _ = st.columns([1, 3])
+                if c_sync.button("🔄 ĐỒNG BỘ LẠI", help="Xây lại bảng tổng hợp từ toàn bộ bảng users"): rollups.reset()
+                with perf.span("compute", "revenue_rollups", "users"):
+                    try: rollups.catch_up(fetch_users_since, reconcile_every=ROLLUP_RECONCILE_HOURS * 3600)
+                    except Exception as e: st.warning(f"Không đồng bộ được dữ liệu mới, đang hiển thị số liệu đã lưu ({e})")
+                    roll = rollups.rollups()
+                if rollups.reconciled_at: st.caption(f"Đối soát toàn bộ lúc {datetime.fromtimestamp(rollups.reconciled_at):%d/%m %H:%M} · user sửa/xoá trực tiếp trên Supabase được cập nhật ở lần đối soát sau (mỗi {ROLLUP_RECONCILE_HOURS:g} giờ) hoặc khi bấm ĐỒNG BỘ LẠI")
+                daily, monthly, pkgs = roll['daily'], roll['monthly'], roll['packages']
+                if not daily.empty:
+                    month_totals = dict(zip(monthly['Month'], monthly['Revenue']))
+                    now = datetime.now(); this_month = now.strftime('%Y-%m')
+
+                    tab1, tab2, tab3, tab4, tab5 = st.tabs(["🏠 TỔNG QUAN", "📅 BÁO CÁO THÁNG", "📦 HIỆU QUẢ GÓI", "🎯 MỤC TIÊU", "📄 DỮ LIỆU GỐC"])
+
+                    with tab1:
+                        rev_today = daily.loc[daily['Day'] == pd.Timestamp(now.date()), 'Revenue'].sum()
+                        st.metric("HÔM NAY", f"{rev_today:,.0f} đ"); st.divider()
+                        with perf.span("chart", "revenue_trend"):
+                            import plotly.express as px
+                            st.plotly_chart(px.bar(daily, x='Day', y='Revenue', color_discrete_sequence=['#FFD700']), use_container_width=True)
+
+                    with tab2:
+                        current_year = now.year
+                        month_users = dict(zip(monthly['Month'], monthly['Users']))
+                        for m in range(1, 13):
+                            m_key = f"{current_year}-{m:02d}"
+                            with st.expander(f"📁 Tháng {m:02d} - {month_totals.get(m_key, 0):,.0f} VNĐ"):
+                                if month_users.get(m_key, 0):
+                                    df_detail = rollups.detail(m_key)
+                                    df_detail['Ngày'] = df_detail['Start_Date'].dt.strftime('%d/%m')
+                                    df_detail['Giờ'] = df_detail['Start_Date'].dt.strftime('%H:%M')
+                                    df_detail['Số Tiền'] = df_detail['Revenue'].map('{:,.0f}'.format)
+                                    st.dataframe(df_detail[['Ngày', 'Giờ', 'full_name', 'Package', 'Số Tiền']], use_container_width=True, hide_index=True)
+                                else: st.info("Trống.")
+
+                    with tab3: # HIỆU QUẢ GÓI
+                        c_chart, c_tbl = st.columns([1.5, 1])
+                        with perf.span("chart", "package_pie"): c_chart.plotly_chart(px.pie(pkgs, values='Revenue', names='Package', hole=.5, color_discrete_sequence=['#FFD700', '#FF4500', '#00BFFF', '#8B0000', '#555']), use_container_width=True)
+                        df_pk = pkgs.rename(columns={'Package': 'Gói', 'Users': 'Số khách', 'Revenue': 'Doanh thu'})
+                        df_pk['Doanh thu'] = df_pk['Doanh thu'].map('{:,.0f}'.format)
+                        c_tbl.dataframe(df_pk, use_container_width=True, hide_index=True)
+
+                    with tab4: # MỤC TIÊU
+                        target = st.number_input("Mục tiêu tháng (VNĐ):", min_value=0, value=int(st.session_state.get('rev_target', 10000000)), step=1000000)
+                        st.session_state.rev_target = target
+                        rev_month = month_totals.get(this_month, 0)
+                        st.metric(f"THÁNG {now.month:02d}", f"{rev_month:,.0f} đ", delta=f"{rev_month - target:,.0f} đ")
+                        st.progress(min(rev_month / target, 1.0) if target else 1.0)
+                        df_goal = monthly[monthly['Month'].str.startswith(f"{now.year}-")]
+                        with perf.span("chart", "monthly_target"): st.plotly_chart(px.bar(df_goal, x='Month', y='Revenue', color_discrete_sequence=['#FFD700']).add_hline(y=target, line_dash="dash", line_color="#FF4500"), use_container_width=True)
+
+                    with tab5: # DỮ LIỆU GỐC
+                        col_f, col_d = st.columns([3, 1])
+                        sel_f = col_f.selectbox("📅 Lọc:", ["Tất cả"] + [f"Tháng {i}" for i in range(1, 13)])
+                        if sel_f == "Tất cả":
+                            raw_filters = [("username", "neq", "admin")]
+                            export_button(col_d, "📤 XUẤT FILE", "raw_export", "users", "id,created_at,expiry_date,username,full_name,email,is_active", raw_filters)
+                            df_ex = paged_query("raw_cursor", "users", "id,created_at,expiry_date,username,full_name", raw_filters, page_size=100)
+                            if not df_ex.empty: df_ex = build_revenue_frame(df_ex)
+                        else:
+                            # cùng nguồn với BÁO CÁO THÁNG: user thiếu created_at được xếp tháng theo expiry_date - số tháng gói
+                            df_ex = rollups.detail(f"{now.year}-{int(sel_f.split(' ')[1]):02d}")
+                            if not df_ex.empty: col_d.download_button("⬇️ TẢI CSV", df_ex.to_csv(index=False).encode('utf-8-sig'), file_name=f"users_{sel_f.replace(' ', '_')}.csv", mime="text/csv")
+                        if not df_ex.empty:
+                            df_ex['Start_Date'] = df_ex['Start_Date'].dt.strftime('%Y-%m-%d')
+                            st.dataframe(df_ex[['Start_Date', 'username', 'full_name', 'Package', 'Revenue']], use_container_width=True, hide_index=True)
+                        else: st.info("Trống.")
+                else: st.info("Database trống.")
+
+            # =========================================================================
+            # 🔧 QUẢN LÝ USER (V59 - SMART SYNC FIXED)
+            # =========================================================================
+            elif menu == "🔧 QUẢN LÝ USER" and IS_ADMIN:
+                st.markdown(f"<div class='main-logo'>QUẢN LÝ USER</div>", unsafe_allow_html=True)
+                c_table, c_edit = st.columns([1.5, 1])
+                with c_table:
+                    st.subheader("Danh sách User")
+                    df = paged_query("user_cursor", "users", "id,username,full_name,is_active,note,expiry_date", [("username", "neq", "admin")])
+                if not df.empty:
+                    with c_table:
+                        event = st.dataframe(df[['username', 'full_name', 'is_active', 'expiry_date', 'note']], use_container_width=True, height=500, selection_mode="multi-row", on_select="rerun")
+                    with c_edit:
+                        sel_rows = event.selection.rows
+                        if len(sel_rows) > 1:
+                            st.subheader(f"⚡ Thao tác hàng loạt ({len(sel_rows)} user)")
+                            sel = df.iloc[sel_rows]; names = sel['username'].tolist()
+                            days = st.number_input("Số ngày:", min_value=1, value=30, step=30)
+                            b_on, b_ext, b_off = st.columns(3)
+                            if b_on.button("✅ KÍCH HOẠT"):
+                                rows = bulk_update_data("users", {"is_active": True}, "username", names)
+                                st.success(f"Đã kích hoạt {len(rows)} user."); st.rerun()
+                            if b_ext.button(f"➕ GIA HẠN {days} NGÀY"):
+                                rows, failed = apply_plan(lambda c, n: bulk_update_data("users", c, "username", n), {"deactivate": [], "activate": extend_groups(sel, days)})
+                                if failed: st.error(f"Lỗi gia hạn: {', '.join(failed)}")
+                                else: st.success(f"Đã gia hạn {len(rows)} user."); st.rerun()
+                            if b_off.button("⛔ KHOÁ"):
+                                rows = bulk_update_data("users", {"is_active": False}, "username", names)
+                                st.success(f"Đã khoá {len(rows)} user."); st.rerun()
+                        elif sel_rows:
+                            st.subheader("🛠️ Chỉnh sửa / Xóa")
+                            idx = sel_rows[0]; user_data = df.iloc[idx]; sel_u = user_data['username']
+                            st.info(f"Đang chọn: **{sel_u}**")
+                            with st.form("edit_form_v59"):
+                                new_name = st.text_input("Họ tên & Gói:", value=str(user_data['full_name']))
+                                new_note = st.text_area("Ghi chú (Note):", value=str(user_data['note']) if pd.notna(user_data['note']) else "")
+                                curr_exp = user_data['expiry_date']
+                                new_exp = st.date_input("Hạn dùng:", value=pd.to_datetime(curr_exp) if pd.notna(curr_exp) else datetime.now())
+                                new_active = st.checkbox("Active (Đã TT)", value=bool(user_data['is_active']))
+                                c_u, c_d = st.columns(2)
+                                if c_u.form_submit_button("💾 LƯU"):
+                                    update_data("users", {"full_name": new_name, "note": new_note, "expiry_date": str(new_exp), "is_active": new_active}, "username", sel_u)
+                                    st.success("Xong!"); st.rerun()
+                                if c_d.form_submit_button("🗑️ XÓA VĨNH VIỄN", type="primary"):
+                                    with st.spinner("Đang xóa dữ liệu..."):
+                                        # LOGIC XÓA ƯU TIÊN: Chạy lệnh xóa thẳng vào DB, bỏ qua các ràng buộc tính toán
+                                        if delete_data("users", "username", sel_u):
+                                            st.success(f"Đã xóa {sel_u}!")
+                                            time.sleep(1.5) # Chờ DB xác nhận
+                                            st.rerun()
+                                        else: st.error("Lỗi xóa!")
+                        else: st.info("👈 Chọn một dòng để sửa, nhiều dòng để thao tác hàng loạt.")
+                        st.divider()
+                        dry = st.checkbox("Chỉ xem trước (dry-run)", value=True)
+                        if st.button("🔄 QUÉT GÓI HẾT HẠN / ĐÃ THANH TOÁN"):
+                            with st.spinner("Đang quét..."): rep_sw = run_sweep(**sweep_kwargs(), dry_run=dry)
+                            st.success(f"{'[Xem trước] ' if dry else ''}Khoá {rep_sw['deactivated']}, kích hoạt {rep_sw['activated']} ({rep_sw['requests']} request).")
+                            short = [f"{u} ({v['paid'] or 0:,}/{v['price'] or 0:,}đ)" for u, v in rep_sw['underpaid'].items()]
+                            if short: st.warning(f"Chuyển thiếu - chưa kích hoạt, giao dịch giữ lại chờ chuyển bù: {', '.join(short)}")
+                            if rep_sw['failed']: st.error(f"Lỗi cập nhật (sẽ thử lại ở lượt sau): {', '.join(rep_sw['failed'])}")
+                            st.json({"khoá": rep_sw['plan']['deactivate'], "kích hoạt": rep_sw['plan']['activate']})
+                        sweeper = get_lifecycle_sweeper()
+                        if sweeper and sweeper.last_report: st.caption(f"🕒 Quét nền: khoá {sweeper.last_report['deactivated']}, kích hoạt {sweeper.last_report['activated']}")
+                else: st.info("Trống.")
+
+            # =========================================================================
+            # ⏱️ PERFORMANCE (ADMIN)
+            # =========================================================================
+            elif menu == "⏱️ PERFORMANCE" and IS_ADMIN:
+                st.markdown(f"<div class='main-logo'>PERFORMANCE</div>", unsafe_allow_html=True)
+                spans = perf.spans(); cs = query_cache.stats(); ns = get_notifier().stats() if get_notifier() else None
+                k1, k2, k3, k4 = st.columns(4)
+                k1.metric("SPAN (ring buffer)", f"{len(spans):,}")
+                k2.metric("CACHE HIT", f"{cs['hit_rate']:.0%}", help=f"{cs['hits']} hit / {cs['misses']} miss")
+                k3.metric("QUERY SUPABASE", sum(1 for x in spans if x['kind'] in ("query", "write")))
+                k4.metric("TELEGRAM CHỜ", ns['queued'] if ns else "-", help=str(ns) if ns else "Chưa cấu hình")
+                by = st.multiselect("Nhóm theo:", ["page", "kind", "name", "table"], default=["kind", "name", "table"])
+                st.dataframe(perf.summary(by=tuple(by) or ("kind",)), use_container_width=True, hide_index=True)
+                c_h, c_s = st.columns([1, 1])
+                with c_h:
+                    kind = st.selectbox("Histogram:", ["rerun", "query", "write", "auth", "compute", "chart"])
+                    hist = perf.histogram(kind)
+                    if not hist.empty:
+                        import plotly.express as px
+                        st.plotly_chart(px.bar(hist, x='ms', y='count', log_x=True, color_discrete_sequence=['#FFD700']), use_container_width=True)
+                with c_s:
+                    st.caption("Span chậm nhất gần đây")
+                    st.dataframe(pd.DataFrame(sorted(spans, key=lambda x: -x['ms'])[:20]), use_container_width=True, hide_index=True)
+                if st.button("🧹 XOÁ SỐ LIỆU"): perf.reset(); st.rerun()
+
+            # --- CÁC PHẦN KHÁC (HLV...) GIỮ NGUYÊN ---
+            elif (menu == "🏠 TỔNG QUAN") or (menu == "💵 TÀI CHÍNH (HLV)"):
+                st.markdown(f"<div class='main-logo'>DASHBOARD HLV</div>", unsafe_allow_html=True)
+                clients = run_query("clients", filter_col="trainer_id", filter_val=TRAINER_ID)
+                if not clients.empty:
+                    k1, k2, k3 = st.columns(3)
+                    k1.markdown(f"<div class='css-card' style='text-align:center'><h2>{len(clients)}</h2><p>HỌC VIÊN</p></div>", unsafe_allow_html=True)
+                    k2.markdown(f"<div class='css-card' style='text-align:center'><h2>Active</h2><p>TRẠNG THÁI</p></div>", unsafe_allow_html=True)
+                    k3.markdown(f"<div class='css-card' style='text-align:center'><h2>{clients['price'].sum():,}</h2><p>DOANH THU</p></div>", unsafe_allow_html=True)
+                    st.dataframe(clients, use_container_width=True)
+                    _, c_exp = st.columns(2)
+                    export_button(c_exp, "📤 XUẤT DANH SÁCH HỌC VIÊN", "clients_export", "clients", filters=[("trainer_id", "eq", TRAINER_ID)])
+                else: st.info("Chưa có dữ liệu.")
+
+            elif menu == "👥 HỌC VIÊN (HLV)" or menu == "👥 HỌC VIÊN":
+                clients = run_query("clients", filter_col="trainer_id", filter_val=TRAINER_ID)
+                if not clients.empty:
+                    c_sel, _ = st.columns([1,2]); c_name = c_sel.selectbox("CHỌN HỌC VIÊN:", clients['name'].tolist())
+                    client = clients[clients['name'] == c_name].iloc[0]; cid = int(client['id'])
+                    st.markdown(f"### {client['name']} - {client['level']}")
+                    t1, t2, t3, t4 = st.tabs(["MEAL PLAN", "CHECK-IN", "TIẾN ĐỘ", "CÀI ĐẶT"])
+                    with t1: st.info("Chế độ ăn hiển thị tại đây")
+                    logs = checkin_store.get(cid)  # dùng chung cho CHECK-IN và TIẾN ĐỘ
+                    with t2:
+                        with st.form("chk"):
+                            d = st.date_input("Ngày"); w = st.number_input("Cân nặng")
+                            if st.form_submit_button("LƯU"):
+                                insert_data("checkins", {"trainer_id": TRAINER_ID, "client_id": cid, "date": str(d), "weight": w})
+                                if str(d) < (logs['date'].iloc[-1] if not logs.empty else ""): checkin_store.invalidate(cid)  # nhập lùi ngày -> tải lại
+                                st.rerun()
+                        st.dataframe(logs)
+                    with t3:
+                        if not logs.empty:
+                            with perf.span("chart", "weight_progress", "checkins", points=len(logs)):
+                                import plotly.graph_objects as go
+                                pts = downsample(logs, 'date', 'weight', 1000)
+                                fig = go.Figure(go.Scattergl(x=pts['date'], y=pts['weight'], mode='lines'))
+                                if len(pts) < len(logs): st.caption(f"Hiển thị {len(pts)}/{len(logs)} điểm (LTTB)")
+                                st.plotly_chart(fig, use_container_width=True)
+
+            elif menu == "➕ THÊM MỚI":
+                st.markdown("### 📝 HỒ SƠ KHÁCH HÀNG")
+                with st.form("new_c"):
+                    n = st.text_input("Họ tên"); p = st.text_input("SĐT"); g = st.selectbox("Giới tính", ["Nam", "Nữ"])
+                    h = st.number_input("Cao (cm)"); w = st.number_input("Nặng (kg)"); pkg = st.text_input("Gói"); pr = st.number_input("Giá")
+                    if st.form_submit_button("LƯU HỒ SƠ"):
+                        insert_data("clients", {"trainer_id": TRAINER_ID, "name": n, "phone": p, "gender": g, "height": h, "start_weight": w, "package_name": pkg, "price": pr, "start_date": datetime.now().strftime('%Y-%m-%d'), "status": "Active"})
+                        st.success("Đã lưu!"); st.rerun()
+                with st.expander("📥 NHẬP HÀNG LOẠT (CSV / Parquet)"):
+                    imp_table = st.radio("Bảng:", ["clients", "checkins"], horizontal=True)
+                    up = st.file_uploader("File", type=["csv", "parquet"])
+                    batch = st.number_input("Số dòng / request", min_value=50, max_value=5000, value=500, step=50)
+                    if up is not None and st.button("🚀 NHẬP"):
+                        own = {"client_id": set(pd.concat(list(iter_query("clients", "id", [("trainer_id", "eq", TRAINER_ID)])) or [pd.DataFrame(columns=["id"])])['id'].astype(int))} if imp_table == "checkins" else None
+                        with st.spinner("Đang nhập..."): rep = bulk_import(supabase, imp_table, up, batch_size=int(batch), overrides={"trainer_id": TRAINER_ID}, allowed=own)
+                        query_cache.invalidate(imp_table)
+                        if imp_table == "checkins": checkin_store.invalidate()  # dòng nhập có thể cũ hơn ngày cuối đã tải
+                        st.success(f"Đã nhập {rep['inserted']} dòng, lỗi {rep['failed']} dòng.")
+                        if rep['errors']: st.dataframe(pd.DataFrame(rep['errors'], columns=["Dòng", "Lỗi"]), hide_index=True)
+except BaseException as e:
+    _rerun_end = type(e).__name__  # st.rerun() / st.stop() kết thúc script bằng exception - vẫn phải đo
+    raise
+finally:
+    st.session_state.last_rerun_ms = (time.perf_counter() - _RERUN_T0) * 1000
+    perf.record("rerun", "script", st.session_state.last_rerun_ms, end=_rerun_end)
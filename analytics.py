@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+# (tên gói trong full_name, doanh thu, số tháng) - kiểm tra theo thứ tự, gói đầu tiên khớp được chọn
+PACKAGES = [("1 Tháng", 200000, 1), ("3 Tháng", 500000, 3), ("6 Tháng", 900000, 6), ("1 Năm", 1500000, 12)]
+LEGACY_PACKAGE = "Dữ liệu cũ"
+PACKAGE_ORDER = [p[0] for p in PACKAGES] + [LEGACY_PACKAGE]
+
+
+def parse_packages(full_names):
+    """Cả cột full_name -> (Revenue, Package, Months); không khớp gói nào = LEGACY_PACKAGE, 0, 0"""
+    s = pd.Series(full_names).astype("string")
+    conds = [s.str.contains(name, regex=False, na=False).to_numpy() for name, _, _ in PACKAGES]
+    out = pd.DataFrame(index=s.index)
+    out['Revenue'] = np.select(conds, [p[1] for p in PACKAGES], 0).astype("int64")
+    out['Package'] = pd.Categorical(np.select(conds, [p[0] for p in PACKAGES], LEGACY_PACKAGE), categories=PACKAGE_ORDER)
+    out['Months'] = np.select(conds, [p[2] for p in PACKAGES], 0).astype("int64")
+    return out
+
+
+def _to_naive(values):
+    return pd.to_datetime(values, errors="coerce", utc=True, format="ISO8601").dt.tz_convert(None)
+
+
+def derive_start_dates(df, months, now=None):
+    """Ngày bắt đầu: created_at, nếu thiếu thì expiry_date - months*30 ngày, cuối cùng là hiện tại"""
+    now = pd.Timestamp(now if now is not None else pd.Timestamp.now())
+    created = _to_naive(df['created_at']) if 'created_at' in df else pd.Series(pd.NaT, index=df.index)
+    expiry = _to_naive(df['expiry_date']) if 'expiry_date' in df else pd.Series(pd.NaT, index=df.index)
+    from_expiry = expiry - pd.to_timedelta(np.asarray(months, dtype="int64") * 30, unit="D")
+    return created.fillna(from_expiry).fillna(now)
+
+
+def build_revenue_frame(df_users, now=None):
+    """Thêm Revenue, Package, Months, Start_Date, Month_Sort cho toàn bộ bảng users trong một lượt"""
+    df = df_users.copy()
+    if df.empty:
+        for col in ('Revenue', 'Package', 'Months', 'Start_Date', 'Month_Sort'): df[col] = pd.Series(dtype="object")
+        return df
+    parsed = parse_packages(df['full_name'] if 'full_name' in df else pd.Series(None, index=df.index))
+    df['Revenue'], df['Package'], df['Months'] = parsed['Revenue'], parsed['Package'], parsed['Months']
+    df['Start_Date'] = derive_start_dates(df, parsed['Months'], now)
+    df['Month_Sort'] = df['Start_Date'].dt.strftime('%Y-%m')
+    return df
+
+
+def rollups_from_base(base):
+    """base: các cột Day, Package, Revenue, Users (một dòng mỗi ngày x gói)"""
+    daily = base.groupby('Day', as_index=False)[['Revenue', 'Users']].sum().sort_values('Day')
+    monthly = (daily.assign(Month=daily['Day'].dt.strftime('%Y-%m'))
+                    .groupby('Month', as_index=False)[['Revenue', 'Users']].sum())
+    packages = base.groupby('Package', as_index=False)[['Revenue', 'Users']].sum()
+    packages['Package'] = pd.Categorical(packages['Package'], categories=PACKAGE_ORDER)
+    packages = packages.sort_values('Package').reset_index(drop=True)
+    packages['Package'] = packages['Package'].astype(str)
+    return {"base": base, "daily": daily.reset_index(drop=True), "monthly": monthly, "packages": packages}
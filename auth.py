@@ -0,0 +1,217 @@
+import base64
+import contextvars
+import hashlib
+import hmac
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+AUTH_COLS = "id,username,password_hash,is_active,expiry_date"
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+
+class LoginThrottle:
+    """Giới hạn số lần sai mật khẩu theo username trong một cửa sổ thời gian.
+
+    Giữ tối đa max_keys username (kể cả username không tồn tại): vượt ngưỡng thì dọn mục đã hết cửa sổ,
+    còn thiếu chỗ thì bỏ mục lâu nhất (LRU).
+    """
+
+    def __init__(self, max_failures=5, window=300.0, clock=time.monotonic, max_keys=10000):
+        self.max_failures, self.window, self._clock, self.max_keys = max_failures, window, clock, max_keys
+        self._fails = OrderedDict()
+        self._lock = threading.Lock()
+
+    def blocked(self, username):
+        with self._lock:
+            now = self._clock()
+            recent = [t for t in self._fails.get(username, ()) if now - t < self.window]
+            if recent: self._fails[username] = recent
+            else: self._fails.pop(username, None)
+            return len(recent) >= self.max_failures
+
+    def fail(self, username):
+        with self._lock:
+            self._fails.setdefault(username, []).append(self._clock()); self._fails.move_to_end(username)
+            if len(self._fails) > self.max_keys:
+                now = self._clock()
+                for k in [k for k, ts in self._fails.items() if now - ts[-1] >= self.window]: del self._fails[k]
+                while len(self._fails) > self.max_keys: self._fails.popitem(last=False)
+
+    def reset(self, username):
+        with self._lock: self._fails.pop(username, None)
+
+
+def load_or_create_secret(path):
+    """Secret ký token: đọc từ file, hoặc sinh ngẫu nhiên 32 byte và lưu (quyền 0600) ở lần đầu.
+
+    Các replica chỉ chấp nhận token của nhau khi dùng chung file này hoặc cùng `[auth] secret`.
+    """
+    try:
+        with open(path, encoding="utf-8") as f: secret = f.read().strip()
+        if secret: return secret
+    except FileNotFoundError: pass
+    secret = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f: f.write(secret)
+    return secret
+
+
+class RevocationStore:
+    """Danh sách token đã thu hồi, lưu SQLite (sống qua restart, dùng chung giữa các process cùng file).
+
+    Mỗi dòng giữ đến khi token hết hạn rồi bị dọn nên kích thước bị chặn bởi số lần logout trong một ttl.
+    """
+
+    def __init__(self, path=":memory:", clock=time.time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS revoked (token TEXT PRIMARY KEY, exp INTEGER NOT NULL)")
+
+    def add(self, token, exp):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO revoked VALUES (?, ?)", (token, int(exp)))
+            self._conn.execute("DELETE FROM revoked WHERE exp <= ?", (int(self._clock()),))
+
+    def __contains__(self, token):
+        with self._lock: return self._conn.execute("SELECT 1 FROM revoked WHERE token = ?", (token,)).fetchone() is not None
+
+
+class SessionTokens:
+    """Token phiên ký HMAC-SHA256 dạng `user_id.expiry.nonce.sig`.
+
+    Token hợp lệ chỉ cần kiểm tra chữ ký + hạn (không bcrypt). Cache giữ kết quả đã kiểm tra;
+    revoke() ghi vào RevocationStore (mặc định trong bộ nhớ - truyền store dùng file để logout có hiệu lực
+    sau restart / ở process khác).
+    """
+
+    def __init__(self, secret, ttl=12 * 3600, max_cached=10000, clock=time.time, revoked=None):
+        if not secret: raise ValueError("Thiếu secret ký token phiên")
+        self._secret = secret if isinstance(secret, bytes) else secret.encode()
+        self.ttl, self.max_cached, self._clock = ttl, max_cached, clock
+        self._cache, self._revoked = {}, revoked if revoked is not None else RevocationStore(clock=clock)
+        self._lock = threading.Lock()
+
+    def _sign(self, payload):
+        return base64.urlsafe_b64encode(hmac.new(self._secret, payload.encode(), hashlib.sha256).digest()[:18]).decode()
+
+    def issue(self, user_id):
+        payload = f"{user_id}.{int(self._clock() + self.ttl)}.{secrets.token_urlsafe(9)}"
+        token = f"{payload}.{self._sign(payload)}"
+        with self._lock:
+            self._cache[token] = (user_id, self._clock() + self.ttl)
+            if len(self._cache) > self.max_cached: self._prune()
+        return token
+
+    def verify(self, token):
+        """user_id nếu token hợp lệ, ngược lại None"""
+        if not token: return None
+        now = self._clock()
+        if token in self._revoked: return None
+        with self._lock: hit = self._cache.get(token)
+        if hit: return hit[0] if hit[1] > now else None
+        try:
+            payload, sig = token.rsplit(".", 1)
+            uid, exp, _ = payload.split(".")
+            if not hmac.compare_digest(sig, self._sign(payload)) or int(exp) <= now: return None
+            uid = int(uid)
+        except ValueError:
+            return None
+        with self._lock:
+            self._cache[token] = (uid, int(exp))
+            if len(self._cache) > self.max_cached: self._prune()
+        return uid
+
+    def _prune(self):
+        now = self._clock()
+        self._cache = {t: v for t, v in self._cache.items() if v[1] > now}
+        while len(self._cache) > self.max_cached: self._cache.pop(next(iter(self._cache)))
+
+    def revoke(self, token):
+        with self._lock: self._cache.pop(token, None)
+        try: exp = int(token.rsplit(".", 1)[0].split(".")[1])
+        except (ValueError, IndexError): return
+        self._revoked.add(token, exp)
+
+
+class Authenticator:
+    """Đăng nhập: lookup chỉ các cột AUTH_COLS, bcrypt chạy trên pool giới hạn, throttle theo username,
+    phát token phiên, và tự chuyển password_hash dạng plaintext cũ sang bcrypt khi đăng nhập đúng.
+
+    lookup(username) -> dict | None; update_hash(user_id, new_hash) -> bool.
+    perf (PerfRecorder, tuỳ chọn) nhận span auth/bcrypt_check và auth/bcrypt_hash đo riêng thời gian bcrypt trên worker.
+    login() trả (status, user, token) với status thuộc OK / LOCKED / INVALID / THROTTLED / BUSY.
+    """
+
+    def __init__(self, lookup, update_hash, secret, workers=4, max_pending=64, rounds=12, throttle=None, tokens=None, timeout=30.0, perf=None):
+        self._lookup, self._update_hash, self._perf = lookup, update_hash, perf
+        self.rounds, self.timeout = rounds, timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.throttle = throttle or LoginThrottle()
+        self.tokens = tokens or SessionTokens(secret)
+
+    def _timed(self, name, fn):
+        if self._perf is None: return fn
+        def run(*args):
+            with self._perf.span("auth", name): return fn(*args)
+        return run
+
+    def _run(self, fn, *args):
+        """Chạy fn trên pool bcrypt; None nếu hàng đợi đã đầy hoặc quá timeout.
+
+        Slot chỉ được trả khi job thực sự xong (kể cả job đã bị bỏ chờ vì timeout) để max_pending luôn có hiệu lực.
+        """
+        if not self._slots.acquire(blocking=False): return None
+        try: fut = self._pool.submit(contextvars.copy_context().run, fn, *args)  # giữ tag trang của perf
+        except Exception: self._slots.release(); raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        try: return fut.result(self.timeout)
+        except FutureTimeout: fut.cancel(); return None
+
+    def hash_password(self, password):
+        hashed = self._run(self._timed("bcrypt_hash", lambda p: bcrypt.hashpw(p.encode('utf-8'), bcrypt.gensalt(self.rounds))), password)
+        if hashed is None: raise RuntimeError("Hệ thống đang bận, thử lại sau")
+        return hashed.decode('utf-8')
+
+    def check_password(self, password, stored):
+        """True/False, hoặc None nếu pool quá tải. Hash không phải bcrypt được coi là plaintext cũ."""
+        if not stored: return False
+        if not stored.startswith(BCRYPT_PREFIXES): return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+        return self._run(self._timed("bcrypt_check", lambda p, h: bcrypt.checkpw(p.encode('utf-8'), h.encode('utf-8'))), password, stored)
+
+    def login(self, username, password):
+        if self.throttle.blocked(username): return "THROTTLED", None, None
+        user = self._lookup(username)
+        if not user: self.throttle.fail(username); return "INVALID", None, None
+        if user['username'] != 'admin' and not bool(user.get('is_active', False)): return "LOCKED", None, None
+        ok = self.check_password(password, user.get('password_hash'))
+        if ok is None: return "BUSY", None, None
+        if not ok: self.throttle.fail(username); return "INVALID", None, None
+        self.throttle.reset(username)
+        if not str(user.get('password_hash') or "").startswith(BCRYPT_PREFIXES):
+            try: self._update_hash(user['id'], self.hash_password(password))
+            except Exception: pass  # migrate lại ở lần đăng nhập sau
+        user = {k: v for k, v in user.items() if k != 'password_hash'}
+        return "OK", user, self.tokens.issue(int(user['id']))
+
+    def resume(self, token):
+        """user_id cho một token phiên hợp lệ - không bcrypt"""
+        return self.tokens.verify(token)
+
+    def rotate(self, token):
+        """(user_id, token mới) và thu hồi token cũ - link có token bị sao chép chỉ dùng được một lần"""
+        uid = self.tokens.verify(token)
+        if uid is None: return None, None
+        self.tokens.revoke(token)
+        return uid, self.tokens.issue(uid)
+
+    def logout(self, token):
+        if token: self.tokens.revoke(token)
@@ -0,0 +1,70 @@
+"""Benchmark tải đăng nhập (logins/giây) trên Supabase giả lập.
+
+So sánh: luồng cũ (select * + bcrypt ngay trên luồng script), Authenticator (lookup rút gọn +
+pool bcrypt giới hạn) và quay lại bằng token phiên (không bcrypt).
+
+    python bench_login.py --users 2000 --sessions 32 --logins 400 --rounds 10 --latency 0.01
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from auth import AUTH_COLS, Authenticator
+from fake_supabase import BENCH_PASSWORD, FakeSupabase, generate_dataset
+
+
+def legacy_login(fake, username, password):
+    rows = fake.table("users").select("*").eq("username", username).execute().data
+    if not rows: return None
+    user = rows[0]
+    try:
+        if bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')): return user
+    except ValueError:
+        if password == user['password_hash']: return user
+    return None
+
+
+def run(label, fn, names, sessions):
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool: results = list(pool.map(fn, names))
+    dt = time.perf_counter() - t0
+    ok = sum(1 for r in results if r)
+    print(f"  {label:<34} {len(names) / dt:10.1f} /s   ({ok}/{len(names)} thành công, {dt:.2f}s)")
+    return results
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users", type=int, default=2000)
+    ap.add_argument("--sessions", type=int, default=32, help="số phiên đăng nhập đồng thời")
+    ap.add_argument("--logins", type=int, default=400)
+    ap.add_argument("--rounds", type=int, default=10, help="bcrypt cost")
+    ap.add_argument("--workers", type=int, default=4, help="số luồng pool bcrypt")
+    ap.add_argument("--latency", type=float, default=0.0)
+    args = ap.parse_args()
+
+    data = generate_dataset(args.users)
+    pw_hash = bcrypt.hashpw(BENCH_PASSWORD.encode(), bcrypt.gensalt(args.rounds)).decode()
+    for i, u in enumerate(data["users"]): u["password_hash"] = BENCH_PASSWORD if i % 10 == 0 else pw_hash  # 10% plaintext cũ
+    fake = FakeSupabase(data, latency=args.latency)
+    active = [u["username"] for u in data["users"] if u["is_active"]]
+    names = [random.Random(i).choice(active) for i in range(args.logins)]
+
+    def lookup(username):
+        rows = fake.table("users").select(AUTH_COLS).eq("username", username).execute().data
+        return rows[0] if rows else None
+
+    def update_hash(uid, h):
+        fake.table("users").update({"password_hash": h}).eq("id", uid).execute(); return True
+
+    auth = Authenticator(lookup, update_hash, "bench-secret", workers=args.workers, max_pending=10**6, rounds=args.rounds)
+    print(f"{args.users} user, {args.sessions} phiên đồng thời, {args.logins} lượt, bcrypt cost {args.rounds}, latency {args.latency}s")
+    run("cũ: select * + bcrypt trên luồng", lambda u: legacy_login(fake, u, BENCH_PASSWORD), names, args.sessions)
+    res = run(f"mới: Authenticator ({args.workers} worker)", lambda u: auth.login(u, BENCH_PASSWORD)[0] == "OK", names, args.sessions)
+    tokens = [auth.tokens.issue(i) for i in range(1, args.logins + 1)]
+    run("quay lại bằng token phiên", auth.resume, tokens, args.sessions)
+    left = sum(1 for u in fake.tables["users"] if not u["password_hash"].startswith("$2"))
+    print(f"  plaintext còn lại sau migrate: {left} (ban đầu {sum(1 for i in range(len(data['users'])) if i % 10 == 0)})")
@@ -0,0 +1,56 @@
+"""So sánh batch_targets/batch_meal_plans với vòng lặp calc_basic + make_meal_df từng khách.
+
+    python bench_nutrition.py [--clients 10000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from nutrition import calc_basic, make_meal_df, batch_targets, batch_meal_plans, ACTIVITIES
+
+
+def synthetic_clients(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'start_weight': rng.uniform(45, 110, n).round(1), 'height': rng.uniform(150, 195, n).round(0),
+        'age': rng.integers(16, 60, n), 'gender': rng.choice(['Nam', 'Nữ'], n),
+        'activity': rng.choice(ACTIVITIES, n), 'goal': rng.choice(['Tăng cân', 'Cải thiện vóc dáng', 'Giảm mỡ'], n),
+    })
+
+
+def per_client(df):
+    targets, plans = [], []
+    for r in df.itertuples(index=False):
+        t, p, c, f = calc_basic(r.start_weight, r.height, r.age, r.gender, r.activity, r.goal)
+        targets.append((t, p, c, f))
+        plans.append((make_meal_df(p, c, f, 'train'), make_meal_df(p, c, f, 'rest')))
+    return targets, plans
+
+
+def batch(df):
+    t = batch_targets(df)
+    return t, batch_meal_plans(t, 'train'), batch_meal_plans(t, 'rest')
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter(); out = fn(*args); return out, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=10000)
+    n = ap.parse_args().clients
+    df = synthetic_clients(n)
+    (loop_targets, loop_plans), t_loop = timed(per_client, df)
+    (targets, train, rest), t_batch = timed(batch, df)
+
+    assert [tuple(x) for x in targets[['TARGET', 'PRO', 'CARB', 'FAT']].itertuples(index=False)] == loop_targets
+    cols = ["CARB (g)", "PRO (g)", "FAT (g)"]
+    assert (train[cols].to_numpy() == np.vstack([p[0][cols].to_numpy() for p in loop_plans])).all()
+    assert (rest[cols].to_numpy() == np.vstack([p[1][cols].to_numpy() for p in loop_plans])).all()
+
+    print(f"{n} khách - kết quả khớp từng dòng")
+    print(f"  vòng lặp calc_basic + make_meal_df: {t_loop * 1000:10.1f} ms")
+    print(f"  batch NumPy:                        {t_batch * 1000:10.1f} ms  (x{t_loop / t_batch:.0f})")
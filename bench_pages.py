@@ -0,0 +1,105 @@
+"""Benchmark render từng trang của ai_coach.py (headless, Streamlit AppTest) trên Supabase giả lập.
+
+Ghi lại thời gian render, số query và bộ nhớ đỉnh mỗi trang ở lần chạy lạnh (cache trống) và
+lần rerun ấm. So với một baseline JSON để chặn regression trước khi deploy:
+
+    python bench_pages.py --scales 1k,10k --latency 0.02 --out bench.json 2>/dev/null   # stderr: cảnh báo bare mode
+    python bench_pages.py --scales 1k --baseline bench.json --tolerance 0.25   # exit 1 nếu chậm hơn 25%
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from fake_supabase import FakeSupabase, generate_dataset, install
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ai_coach.py")
+ADMIN_PAGES = ["📊 DOANH CHỦ DASHBOARD", "🔧 QUẢN LÝ USER", "💵 TÀI CHÍNH (HLV)", "👥 HỌC VIÊN (HLV)", "➕ THÊM MỚI", "⏱️ PERFORMANCE"]
+TRAINER_PAGES = ["🏠 TỔNG QUAN", "👥 HỌC VIÊN", "➕ THÊM MỚI"]
+LOGIN_PAGE = "🔑 ĐĂNG NHẬP"
+
+
+def _app(tmpdir, user, page):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP, default_timeout=600)
+    at.secrets["supabase"] = {"URL": "https://fake.supabase.co", "KEY": "fake"}
+    at.secrets["rollups"] = {"path": os.path.join(tmpdir, "rollups.db")}
+    at.secrets["auth"] = {"secret": "bench-secret", "revoked_path": os.path.join(tmpdir, "revoked.db")}
+    if user is not None:
+        at.session_state["logged_in"] = True
+        at.session_state["user_info"] = user
+        at.session_state["menu"] = page
+    return at
+
+
+def _measure(fake, at):
+    q0 = fake.query_count
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if at.exception: raise RuntimeError(f"Trang lỗi: {at.exception[0].message}")
+    return {"ms": round(elapsed * 1000, 1), "queries": fake.query_count - q0, "peak_mb": round(peak / 2**20, 2)}
+
+
+def bench_scale(scale, latency):
+    import streamlit as st
+    data = generate_dataset(scale)
+    fake = install(FakeSupabase(data, latency=latency))
+    admin = {k: v for k, v in data["users"][0].items() if k != "password_hash"}
+    trainer = {k: v for k, v in data["users"][1].items() if k != "password_hash"}
+    cases = [(LOGIN_PAGE, None)] + [(p, admin) for p in ADMIN_PAGES] + [(p, trainer) for p in TRAINER_PAGES]
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for page, user in cases:
+            st.cache_resource.clear()  # lạnh: client, query cache, rollup store... đều tạo lại
+            os.path.exists(os.path.join(tmpdir, "rollups.db")) and os.remove(os.path.join(tmpdir, "rollups.db"))
+            at = _app(tmpdir, user, page)
+            cold = _measure(fake, at)
+            warm = _measure(fake, at)
+            role = "-" if user is None else ("admin" if user["username"] == "admin" else "hlv")
+            results.append({"scale": scale, "page": page, "role": role, "cold": cold, "warm": warm})
+    return results
+
+
+def compare(results, baseline, tolerance):
+    base = {(r["scale"], r["role"], r["page"]): r for r in baseline}
+    failures = []
+    for r in results:
+        b = base.get((r["scale"], r["role"], r["page"]))
+        if not b: continue
+        for phase in ("cold", "warm"):
+            if r[phase]["ms"] > b[phase]["ms"] * (1 + tolerance) and r[phase]["ms"] - b[phase]["ms"] > 20:
+                failures.append(f"{r['scale']} {r['page']} [{phase}] {b[phase]['ms']} -> {r[phase]['ms']} ms")
+            if r[phase]["queries"] > b[phase]["queries"]:
+                failures.append(f"{r['scale']} {r['page']} [{phase}] query {b[phase]['queries']} -> {r[phase]['queries']}")
+    return failures
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scales", default="1k", help="danh sách cách nhau bởi dấu phẩy: 1k,10k,100k")
+    ap.add_argument("--latency", type=float, default=0.0, help="độ trễ giả lập mỗi query (giây)")
+    ap.add_argument("--out", help="ghi kết quả JSON")
+    ap.add_argument("--baseline", help="JSON baseline để so sánh")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    args = ap.parse_args()
+
+    results = []
+    for scale in args.scales.split(","):
+        results += bench_scale(scale.strip(), args.latency)
+    print(f"{'scale':>6} {'role':>5} {'page':<24} {'cold ms':>9} {'q':>4} {'MB':>7} | {'warm ms':>9} {'q':>4} {'MB':>7}")
+    for r in results:
+        c, w = r["cold"], r["warm"]
+        print(f"{r['scale']:>6} {r['role']:>5} {r['page']:<24} {c['ms']:>9} {c['queries']:>4} {c['peak_mb']:>7} | {w['ms']:>9} {w['queries']:>4} {w['peak_mb']:>7}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f: json.dump(results, f, ensure_ascii=False, indent=1)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f: failures = compare(results, json.load(f), args.tolerance)
+        for line in failures: print("REGRESSION:", line)
+        sys.exit(1 if failures else 0)
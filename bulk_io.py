@@ -0,0 +1,185 @@
+"""Nhập / xuất hàng loạt cho clients và checkins (CSV hoặc Parquet), xử lý theo luồng từng khối.
+
+    python bulk_io.py import clients roster.csv --trainer-id 5 --batch-size 500 --workers 4
+    python bulk_io.py export checkins checkins.parquet --filter client_id=12
+"""
+import argparse
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+
+from db import fetch_pages
+
+# kiểu dữ liệu từng cột: int / float / str / date
+SCHEMAS = {
+    "clients": {"trainer_id": "int", "name": "str", "phone": "str", "gender": "str", "height": "float", "start_weight": "float",
+                "package_name": "str", "price": "float", "start_date": "date", "status": "str", "level": "str"},
+    "checkins": {"trainer_id": "int", "client_id": "int", "date": "date", "weight": "float"},
+}
+REQUIRED = {"clients": ("trainer_id", "name"), "checkins": ("trainer_id", "client_id", "date", "weight")}
+
+
+def _fmt_of(source, fmt=None):
+    if fmt: return fmt
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    return "parquet" if str(name).lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def _pyarrow():
+    try:
+        import pyarrow, pyarrow.parquet
+        return pyarrow
+    except ImportError as e:
+        raise ImportError("Cần cài pyarrow để đọc/ghi Parquet: pip install pyarrow") from e
+
+
+def _arrow_schema(pa, table, batch):
+    """Schema Parquet cố định cho cả file: kiểu theo SCHEMAS nếu biết, còn lại suy từ trang đầu (cột toàn null -> string)"""
+    hints = {"int": pa.int64(), "float": pa.float64(), "str": pa.string(), "date": pa.string()}
+    known = SCHEMAS.get(table, {})
+    return pa.schema([pa.field(f.name, hints[known[f.name]] if f.name in known else (pa.string() if pa.types.is_null(f.type) else f.type)) for f in batch.schema])
+
+
+def _conform(pa, rows, schema):
+    """Ép một trang về schema của file (cột thiếu -> null, cột string nhận mọi giá trị dạng str)"""
+    cols = []
+    for f in schema:
+        vals = [r.get(f.name) for r in rows]
+        if pa.types.is_string(f.type): vals = [None if v is None else str(v) for v in vals]
+        cols.append(pa.array(vals, type=f.type))
+    return pa.Table.from_arrays(cols, schema=schema)
+
+
+def read_chunks(source, chunk_size=5000, fmt=None):
+    """Đọc file (đường dẫn hoặc file-like) thành từng DataFrame <= chunk_size dòng"""
+    if _fmt_of(source, fmt) == "parquet":
+        pa = _pyarrow()
+        for batch in pa.parquet.ParquetFile(source).iter_batches(batch_size=chunk_size): yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_size, dtype=str, keep_default_na=False, na_values=[""])
+
+
+def parse_dates(raw, dayfirst=True):
+    """Parse từng giá trị: ISO (yyyy-mm-dd...) trước, còn lại theo dd/mm/yyyy (dayfirst) - không suy một định dạng cho cả khối"""
+    out = pd.to_datetime(raw, format="ISO8601", errors="coerce")
+    rest = raw.notna() & out.isna()
+    if rest.any(): out[rest] = pd.to_datetime(raw[rest], format="mixed", dayfirst=dayfirst, errors="coerce")
+    return out
+
+
+def validate_chunk(df, table, defaults=None, row_offset=0, overrides=None, allowed=None, dayfirst=True):
+    """Ép kiểu theo SCHEMAS, bỏ cột lạ; trả (records hợp lệ, [(dòng, lý do)])
+
+    defaults chỉ điền ô trống, overrides ghi đè mọi dòng (vd. trainer_id của phiên đăng nhập),
+    allowed = {cột: tập giá trị hợp lệ} loại các dòng tham chiếu ngoài phạm vi (vd. client_id của HLV khác).
+    """
+    schema = SCHEMAS[table]
+    df = df[[c for c in df.columns if c in schema]].copy()
+    for col, val in (defaults or {}).items():
+        df[col] = df[col].fillna(val) if col in df else val
+    for col, val in (overrides or {}).items(): df[col] = val
+    bad = pd.Series("", index=df.index)
+    for col in REQUIRED[table]:
+        missing = df[col].isna() if col in df else pd.Series(True, index=df.index)
+        bad = bad.where(~missing, bad + f"thiếu {col}; ")
+    for col, kind in schema.items():
+        if col not in df: continue
+        raw = df[col]
+        if kind in ("int", "float"):
+            conv = pd.to_numeric(raw, errors="coerce")
+            if kind == "int": conv = conv.where(conv % 1 == 0).astype("Int64")
+        elif kind == "date":
+            conv = parse_dates(raw, dayfirst).dt.strftime('%Y-%m-%d')
+        else:
+            conv = raw.where(raw.isna(), raw.astype(str).str.strip())
+        bad = bad.where(~(raw.notna() & conv.isna()), bad + f"{col} sai định dạng; ")
+        df[col] = conv
+    for col, vals in (allowed or {}).items():
+        if col in df: bad = bad.where(~(df[col].notna() & ~df[col].isin(vals)), bad + f"{col} không thuộc quyền quản lý; ")
+    ok = bad == ""
+    errors = [(row_offset + i + 1, reason.strip("; ")) for i, reason in enumerate(bad) if reason]
+    clean = df[ok].astype(object).where(df[ok].notna(), None)
+    return clean.to_dict("records"), errors
+
+
+def bulk_import(client, table, source, batch_size=500, max_workers=4, defaults=None, fmt=None, on_progress=None, overrides=None, allowed=None, dayfirst=True):
+    """Nhập file vào bảng bằng insert nhiều dòng / request, tối đa max_workers request song song.
+
+    File được đọc theo khối nên bộ nhớ chỉ giữ khoảng max_workers*2 batch đang chờ gửi.
+    Trả dict: inserted, failed, errors (tối đa 100 lỗi đầu, dạng (dòng, lý do)).
+    """
+    report = {"inserted": 0, "failed": 0, "errors": []}
+    lock = threading.Lock()
+
+    def send(records):
+        try:
+            client.table(table).insert(records).execute(); ok, err = len(records), None
+        except Exception as e:
+            ok, err = 0, str(e)
+        with lock:
+            report["inserted"] += ok
+            if err: report["failed"] += len(records); report["errors"].append((None, err))
+            if on_progress: on_progress(report)
+
+    pending, offset = set(), 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for chunk in read_chunks(source, max(batch_size, 1000), fmt):
+            records, errors = validate_chunk(chunk, table, defaults, offset, overrides, allowed, dayfirst)
+            offset += len(chunk)
+            with lock: report["failed"] += len(errors); report["errors"].extend(errors)
+            for i in range(0, len(records), batch_size):
+                if len(pending) >= max_workers * 2: pending = wait(pending, return_when=FIRST_COMPLETED).not_done
+                pending.add(pool.submit(send, records[i:i + batch_size]))
+        wait(pending)
+    report["errors"] = report["errors"][:100]
+    return report
+
+
+def export_table(client, table, out, fmt=None, select="*", filters=None, key_col="id", page_size=1000):
+    """Ghi bảng ra CSV/Parquet theo từng trang keyset; trả số dòng đã ghi"""
+    fmt, total = _fmt_of(out, fmt), 0
+    if fmt == "parquet":
+        pa, writer = _pyarrow(), None
+        try:
+            for rows in fetch_pages(client, table, select, filters, key_col, page_size):
+                if writer is None: writer = pa.parquet.ParquetWriter(out, _arrow_schema(pa, table, pa.Table.from_pylist(rows)))
+                writer.write_table(_conform(pa, rows, writer.schema)); total += len(rows)
+        finally:
+            if writer: writer.close()
+        return total
+    f = open(out, "w", encoding="utf-8-sig", newline="") if isinstance(out, (str, os.PathLike)) else out
+    try:
+        columns = None
+        for rows in fetch_pages(client, table, select, filters, key_col, page_size):
+            df = pd.DataFrame(rows)
+            if columns is None: columns = list(df.columns)
+            df.reindex(columns=columns).to_csv(f, header=total == 0, index=False); total += len(df)
+    finally:
+        if f is not out: f.close()
+    return total
+
+
+if __name__ == "__main__":
+    from db import client_from_env
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("action", choices=["import", "export"])
+    ap.add_argument("table", choices=sorted(SCHEMAS))
+    ap.add_argument("path")
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--trainer-id", type=int, help="Gán trainer_id cho các dòng thiếu")
+    ap.add_argument("--monthfirst", action="store_true", help="ngày không theo ISO là mm/dd/yyyy (mặc định dd/mm/yyyy)")
+    ap.add_argument("--filter", action="append", default=[], help="cột=giá trị (export)")
+    args = ap.parse_args()
+    client = client_from_env()
+    if args.action == "import":
+        rep = bulk_import(client, args.table, args.path, args.batch_size, args.workers,
+                          defaults={"trainer_id": args.trainer_id} if args.trainer_id else None,
+                          on_progress=lambda r: print(f"\r{r['inserted']} dòng đã nhập", end="", flush=True), dayfirst=not args.monthfirst)
+        print(f"\nXong: {rep['inserted']} nhập, {rep['failed']} lỗi")
+        for line, reason in rep["errors"][:20]: print(f"  dòng {line or '-'}: {reason}")
+    else:
+        filters = [(k, "eq", v) for k, v in (item.split("=", 1) for item in args.filter)]
+        print(f"Đã ghi {export_table(client, args.table, args.path, filters=filters)} dòng")
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: giữ hình dạng đường khi giảm còn `threshold` điểm; trả mảng chỉ số"""
+    n = len(x)
+    if threshold >= n or threshold < 3: return np.arange(n)
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)  # threshold-2 bucket giữa điểm đầu và cuối
+    out = np.empty(threshold, dtype=np.intp)
+    out[0], out[-1], a = 0, n - 1, 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def downsample(df, x_col, y_col, threshold=1000):
+    if len(df) <= threshold: return df
+    x = pd.to_datetime(df[x_col]).to_numpy().astype("int64")
+    return df.iloc[lttb(x, df[y_col].to_numpy(dtype=float), threshold)]
+
+
+class CheckinSeriesStore:
+    """Chuỗi check-in của từng học viên, dùng chung cho cả process.
+
+    Lần đầu tải toàn bộ lịch sử; các lần sau chỉ gọi fetch(client_id, since) lấy dòng có
+    date >= ngày cuối đã thấy rồi gộp theo id. Giữ tối đa max_clients chuỗi (LRU).
+    Sau ttl giây chuỗi được tải lại toàn bộ để nhận cả dòng bị sửa/xoá ngoài process này.
+    """
+
+    def __init__(self, fetch, date_col="date", key_col="id", max_clients=128, ttl=300.0, clock=time.monotonic):
+        self._fetch = fetch
+        self.date_col, self.key_col, self.max_clients = date_col, key_col, max_clients
+        self.ttl, self._clock = ttl, clock
+        self._lock = threading.Lock()
+        self._series = OrderedDict()  # client_id -> (loaded_at, df)
+
+    def get(self, client_id):
+        with self._lock: loaded_at, df = self._series.get(client_id, (None, None))
+        if df is None or df.empty or self._clock() - loaded_at > self.ttl:
+            df, loaded_at = self._normalize(self._fetch(client_id, None)), self._clock()
+        else:
+            new = self._fetch(client_id, df[self.date_col].iloc[-1])
+            if new is not None and not new.empty:
+                merged = pd.concat([df, new], ignore_index=True)
+                df = self._normalize(merged.drop_duplicates(self.key_col, keep="last") if self.key_col in merged else merged)
+        with self._lock:
+            self._series[client_id] = (loaded_at, df); self._series.move_to_end(client_id)
+            while len(self._series) > self.max_clients: self._series.popitem(last=False)
+        return df.copy()
+
+    def invalidate(self, client_id=None):
+        with self._lock:
+            if client_id is None: self._series.clear()
+            else: self._series.pop(client_id, None)
+
+    def _normalize(self, df):
+        if df is None or df.empty or self.date_col not in df: return pd.DataFrame() if df is None else df
+        return df.sort_values(self.date_col, kind="stable").reset_index(drop=True)
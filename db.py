@@ -0,0 +1,74 @@
+import threading
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(url, key):
+    """Supabase client dùng chung cho cả process.
+
+    Tạo một lần rồi tái sử dụng cho mọi session và mọi lần rerun: sub-client postgrest
+    giữ một httpx.Client duy nhất nên connection pool, keep-alive và TLS session được
+    dùng lại thay vì bắt tay lại mỗi lần. Import supabase được hoãn tới lần gọi đầu.
+    """
+    with _lock:
+        client = _clients.get((url, key))
+        if client is None:
+            from supabase import create_client
+            client = _clients[(url, key)] = create_client(url, key)
+        return client
+
+
+RANGE_OPS = ("eq", "neq", "gt", "gte", "lt", "lte")
+
+
+def build_query(client, table_name, select="*", filter_col=None, filter_val=None, filters=None, order_by=None, limit=None, after=None):
+    """Dựng query postgrest: projection, eq, lọc khoảng, sắp xếp và keyset.
+
+    filters: list (cột, op, giá trị) với op thuộc RANGE_OPS, vd ("created_at", "gte", "2024-01-01").
+    after: (cột, giá trị) - chỉ lấy các dòng sau con trỏ theo chiều của order_by.
+    """
+    query = client.table(table_name).select(select)
+    if filter_col and filter_val is not None: query = query.eq(filter_col, filter_val)
+    for col, op, val in filters or ():
+        if op not in RANGE_OPS: raise ValueError(f"Toán tử lọc không hỗ trợ: {op}")
+        if val is not None: query = getattr(query, op)(col, val)
+    desc = bool(order_by) and order_by[1] == 'desc'
+    if after and after[1] is not None: query = (query.lt if desc else query.gt)(after[0], after[1])
+    if order_by: query = query.order(order_by[0], desc=desc)
+    if limit: query = query.limit(limit)
+    return query
+
+
+def fetch_pages(client, table_name, select="*", filters=None, key_col="id", page_size=1000, desc=False):
+    """Generator trả về từng trang (list dict) theo keyset trên key_col - bộ nhớ không tăng theo kích thước bảng"""
+    if select != "*" and key_col not in [c.strip() for c in select.split(",")]: select = f"{select},{key_col}"
+    order_by, last = (key_col, 'desc' if desc else 'asc'), None
+    while True:
+        rows = build_query(client, table_name, select, filters=filters, order_by=order_by, limit=page_size, after=(key_col, last)).execute().data
+        if not rows: return
+        yield rows
+        if len(rows) < page_size: return
+        last = rows[-1][key_col]
+
+
+def client_from_env(secrets_path=".streamlit/secrets.toml"):
+    """Client cho script/CLI ngoài Streamlit: lấy SUPABASE_URL/SUPABASE_KEY từ env, nếu thiếu thì đọc secrets.toml"""
+    import os
+    url, key = os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")
+    if not (url and key):
+        import tomllib
+        with open(secrets_path, "rb") as f: cfg = tomllib.load(f)["supabase"]
+        url, key = cfg["URL"], cfg["KEY"]
+    return get_client(url, key)
+
+
+def bulk_update(client, table_name, changes, match_col, match_vals, chunk=200):
+    """Cập nhật cùng một `changes` cho mọi dòng có match_col thuộc match_vals.
+
+    Mỗi khối `chunk` giá trị là một request `in_` (giới hạn độ dài URL); trả về list dòng đã cập nhật.
+    """
+    vals, out = list(dict.fromkeys(match_vals)), []
+    for i in range(0, len(vals), chunk):
+        out += client.table(table_name).update(changes).in_(match_col, vals[i:i + chunk]).execute().data or []
+    return out
@@ -0,0 +1,177 @@
+"""Supabase giả lập trong bộ nhớ để profile / benchmark offline (không chạm production).
+
+Hỗ trợ chuỗi table().select().eq().gt().order().limit().insert().update().delete().execute()
+mà db.build_query và các hàm ghi dùng, có thể chèn độ trễ mạng giả lập cho mỗi execute().
+
+    fake = FakeSupabase(generate_dataset("10k"), latency=0.02)
+    install(fake)   # `from supabase import create_client` sẽ trả về fake
+"""
+import random
+import sys
+import threading
+import time
+import types
+from collections import Counter
+
+import bcrypt
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+CHECKINS_PER_CLIENT = 5
+BENCH_PASSWORD = "bench123"
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data, self.count = data, len(data)
+
+
+class FakeQuery:
+    _OPS = {"eq": lambda a, b: a == b, "neq": lambda a, b: a != b, "gt": lambda a, b: a > b,
+            "gte": lambda a, b: a >= b, "lt": lambda a, b: a < b, "lte": lambda a, b: a <= b, "in": lambda a, b: a in b}
+
+    def __init__(self, db, table):
+        self._db, self._table = db, table
+        self._op, self._payload, self._cols = "select", None, None
+        self._filters, self._order, self._limit = [], [], None
+
+    # --- builder ---
+    def select(self, columns="*", count=None):
+        self._cols = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, data, **_): self._op, self._payload = "insert", data; return self
+    def update(self, data, **_): self._op, self._payload = "update", data; return self
+    def delete(self, **_): self._op = "delete"; return self
+    def order(self, column, desc=False, **_): self._order.append((column, desc)); return self
+    def limit(self, n, **_): self._limit = n; return self
+    def in_(self, column, values): self._filters.append((column, "in", set(values))); return self
+
+    def __getattr__(self, op):
+        if op in self._OPS: return lambda column, value: (self._filters.append((column, op, value)), self)[1]
+        raise AttributeError(op)
+
+    # --- thực thi ---
+    def execute(self):
+        return FakeResponse(self._db._execute(self))
+
+    def _match(self, rows):
+        for col, op, val in self._filters:
+            fn = self._OPS[op]
+            rows = [r for r in rows if r.get(col) is not None and fn(r[col], val)]
+        return rows
+
+
+class FakeSupabase:
+    """Các bảng là list dict; index băm cho eq được dựng lười và xoá khi có ghi."""
+
+    def __init__(self, tables=None, latency=0.0, jitter=0.0, seed=0):
+        self.tables = {k: list(v) for k, v in (tables or {}).items()}
+        self.latency, self.jitter = latency, jitter
+        self.calls = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._index = {}
+        self._next_id = {k: max((r.get("id") or 0 for r in v), default=0) + 1 for k, v in self.tables.items()}
+
+    def table(self, name): return FakeQuery(self, name)
+    from_ = table
+
+    @property
+    def query_count(self): return sum(self.calls.values())
+
+    def _execute(self, q):
+        if self.latency or self.jitter: time.sleep(self.latency + self._rng.random() * self.jitter)
+        with self._lock:
+            self.calls[(q._table, q._op)] += 1
+            rows = self.tables.setdefault(q._table, [])
+            if q._op == "insert": return self._insert(q._table, q._payload)
+            matched = q._match(self._candidates(q, rows))
+            if q._op == "update":
+                for r in matched: r.update(q._payload)
+                self._index.pop(q._table, None)
+                return [dict(r) for r in matched]
+            if q._op == "delete":
+                gone = {id(r) for r in matched}
+                self.tables[q._table] = [r for r in rows if id(r) not in gone]
+                self._index.pop(q._table, None)
+                return [dict(r) for r in matched]
+            for col, desc in reversed(q._order):  # sort ổn định nhiều khoá, NULL xếp cuối khi asc
+                present = [r for r in matched if r.get(col) is not None]
+                missing = [r for r in matched if r.get(col) is None]
+                present.sort(key=lambda r: r[col], reverse=desc)
+                matched = missing + present if desc else present + missing
+            if q._limit is not None: matched = matched[:q._limit]
+            return [{c: r.get(c) for c in q._cols} if q._cols else dict(r) for r in matched]
+
+    def _candidates(self, q, rows):
+        """Dùng index băm cho bộ lọc eq đầu tiên (nếu có) thay vì quét toàn bảng"""
+        for col, op, val in q._filters:
+            if op != "eq": continue
+            idx = self._index.setdefault(q._table, {})
+            if col not in idx:
+                by = idx[col] = {}
+                for r in rows: by.setdefault(r.get(col), []).append(r)
+            return idx[col].get(val, [])
+        return rows
+
+    def _insert(self, table, payload):
+        out = []
+        for row in (payload if isinstance(payload, list) else [payload]):
+            row = dict(row)
+            if row.get("id") is None: row["id"] = self._next_id.get(table, 1)
+            self._next_id[table] = max(self._next_id.get(table, 1), row["id"]) + 1
+            self.tables[table].append(row); out.append(dict(row))
+        self._index.pop(table, None)
+        return out
+
+
+def install(fake):
+    """Thay module `supabase` bằng module giả có create_client trả về `fake`; xoá client đã cache trong db"""
+    mod = types.ModuleType("supabase")
+    mod.create_client = lambda url, key, options=None: fake
+    mod.Client = FakeSupabase
+    sys.modules["supabase"] = mod
+    import db
+    with db._lock: db._clients.clear()
+    return fake
+
+
+def generate_dataset(scale="1k", seed=0, trainers=20, checkins_per_client=CHECKINS_PER_CLIENT):
+    """users / clients / checkins tổng hợp: `scale` user, `scale` học viên, scale*checkins_per_client check-in.
+
+    User id=1 là admin, id=2 là HLV benchmark (được gán nhiều học viên nhất). Mật khẩu mọi user: BENCH_PASSWORD.
+    """
+    n = SCALES.get(scale, scale) if isinstance(scale, str) else scale
+    rng = random.Random(seed)
+    pw = bcrypt.hashpw(BENCH_PASSWORD.encode(), bcrypt.gensalt(rounds=4)).decode()
+    now = time.time()
+    packages = ["1 Tháng", "3 Tháng", "6 Tháng", "1 Năm (VIP)", None]
+    users = [{"id": 1, "username": "admin", "password_hash": pw, "full_name": "Admin", "email": "admin@example.com",
+              "expiry_date": None, "is_active": True, "created_at": "2020-01-01T00:00:00+00:00", "note": ""}]
+    for i in range(2, n + 2):
+        created = now - rng.random() * 730 * 86400
+        pkg = rng.choice(packages)
+        users.append({
+            "id": i, "username": f"u{i:06d}", "password_hash": pw,
+            "full_name": f"Hội viên {i} ({pkg})" if pkg else f"Hội viên {i}", "email": f"u{i}@example.com",
+            "expiry_date": time.strftime("%Y-%m-%d", time.gmtime(created + rng.choice([30, 90, 180, 365]) * 86400)),
+            "is_active": rng.random() < 0.8, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(created)), "note": "",
+        })
+    trainer_ids = list(range(2, min(trainers, n) + 2))
+    clients = []
+    for i in range(1, n + 1):
+        clients.append({
+            "id": i, "trainer_id": 2 if i % 4 == 0 else rng.choice(trainer_ids), "name": f"Học viên {i}",
+            "phone": f"09{rng.randrange(10**8):08d}", "gender": rng.choice(["Nam", "Nữ"]), "height": rng.randint(150, 190),
+            "start_weight": round(rng.uniform(45, 100), 1), "package_name": "PT 1-1", "price": rng.choice([1500000, 3000000, 5000000]),
+            "start_date": time.strftime("%Y-%m-%d", time.gmtime(now - rng.random() * 365 * 86400)), "status": "Active", "level": "🔰 Beginner / Intermediate",
+        })
+    checkins, cid = [], 1
+    for c in clients:
+        w = c["start_weight"]
+        for d in range(checkins_per_client):
+            w = round(w + rng.uniform(-0.6, 0.4), 1)
+            checkins.append({"id": cid, "trainer_id": c["trainer_id"], "client_id": c["id"],
+                             "date": time.strftime("%Y-%m-%d", time.gmtime(now - (checkins_per_client - d) * 7 * 86400)), "weight": w})
+            cid += 1
+    return {"users": users, "clients": clients, "checkins": checkins}
@@ -0,0 +1,208 @@
+"""Quét vòng đời gói đăng ký: khoá tài khoản hết hạn, kích hoạt tài khoản đã chuyển khoản "KICH HOAT <username>".
+
+Mọi thay đổi được gom thành bulk update (một request cho mỗi nhóm cùng giá trị).
+
+    python lifecycle.py --transactions giao_dich.csv --dry-run
+    python lifecycle.py --transactions giao_dich.csv --interval 600     # chạy lặp mỗi 10 phút
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+
+from analytics import PACKAGES, parse_packages
+from db import bulk_update, fetch_pages
+
+USER_COLS = "id,username,full_name,is_active,expiry_date"
+PAYMENT_RE = re.compile(r"KICH\s*HOAT\s+([A-Za-z0-9_.\-@]+)", re.IGNORECASE)
+CONTENT_COLS = ("content", "description", "noi_dung", "nội dung", "addinfo")
+AMOUNT_COLS = ("amount", "so_tien", "số tiền", "credit")
+MONTH_DAYS = 30
+_SWEEP_LOCK = threading.Lock()  # nút quét tay và LifecycleSweeper không được đọc/ghi state chồng nhau
+
+
+# --- LẬP KẾ HOẠCH (thuần, không gọi DB) ---
+def new_expiry(current, days, today):
+    """Gia hạn từ hạn hiện tại nếu còn hạn, ngược lại từ hôm nay"""
+    cur = pd.to_datetime(current, errors="coerce")
+    base = cur.date() if pd.notna(cur) and cur.date() > today else today
+    return (base + timedelta(days=int(days))).isoformat()
+
+
+def group_by_value(pairs):
+    """[(username, giá trị)] -> {giá trị: [username]} để mỗi nhóm là một bulk update"""
+    out = {}
+    for u, v in pairs: out.setdefault(v, []).append(u)
+    return out
+
+
+def extend_groups(users, days, today=None):
+    """Gia hạn `days` ngày cho từng user (tính từ hạn riêng) -> {expiry_date mới: [username]}"""
+    today = today or date.today()
+    return group_by_value((u, new_expiry(e, days, today)) for u, e in zip(users['username'], users['expiry_date']))
+
+
+def load_transactions(path):
+    """CSV sao kê: cần một cột nội dung (content/description/noi_dung...) và tuỳ chọn cột số tiền"""
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    cols = {c.lower().strip(): c for c in df.columns}
+    content = next((cols[c] for c in CONTENT_COLS if c in cols), None)
+    if content is None: raise ValueError(f"Không tìm thấy cột nội dung chuyển khoản trong {path}")
+    amount = next((cols[c] for c in AMOUNT_COLS if c in cols), None)
+    out = pd.DataFrame({"content": df[content]})
+    out["amount"] = pd.to_numeric(df[amount].str.replace(r"[^\d]", "", regex=True), errors="coerce") if amount else float("nan")
+    out["username"] = out["content"].str.extract(PAYMENT_RE, expand=False).str.lower()
+    out["txid"] = [hashlib.sha1("|".join(map(str, r)).encode()).hexdigest() for r in df.itertuples(index=False)]
+    return out[out["username"].notna()]
+
+
+def _package_for(users, paid):
+    """(số tháng, giá gói) từng user: theo tên gói trong full_name; dữ liệu cũ không ghi gói thì lấy gói
+    lớn nhất mà số tiền đã trả đủ mua (giá 0 = không gói nào đủ)"""
+    pkgs = parse_packages(users['full_name'])
+    amounts = paid.reindex(users['username'].str.lower()).fillna(0).to_numpy()
+    out = []
+    for m, price, a in zip(pkgs['Months'], pkgs['Revenue'], amounts):
+        if not m: m, price = max(((pm, money) for _, money, pm in PACKAGES if money <= a), default=(0, 0))
+        out.append((int(m), int(price)))
+    return out
+
+
+def plan_sweep(users, transactions=None, processed=(), today=None):
+    """-> {"deactivate": [username], "activate": {expiry: [username]}, "txids": {username: [giao dịch đã dùng]},
+           "underpaid": {username: {"paid": tổng đã chuyển, "price": giá gói}}}
+
+    Các giao dịch chưa xử lý của một user được cộng dồn; chưa đủ giá gói (hoặc sao kê không có số tiền) thì
+    không kích hoạt và giao dịch không bị đánh dấu đã dùng - lần chuyển bù sau sẽ được cộng tiếp.
+    """
+    today = today or date.today()
+    users = users[users['username'] != 'admin']
+    active = users['is_active'].fillna(False).astype(bool)
+    expiry = pd.to_datetime(users['expiry_date'], errors="coerce")
+    plan = {"deactivate": users.loc[active & (expiry < pd.Timestamp(today)), 'username'].tolist(), "activate": {}, "txids": {}, "underpaid": {}}
+    if transactions is None or transactions.empty: return plan
+    tx = transactions[~transactions['txid'].isin(set(processed))]
+    tx = tx[tx['username'].isin(set(users['username'].str.lower()))]
+    if tx.empty: return plan
+    paid = tx.groupby('username')['amount'].sum(min_count=1)
+    payers = users[users['username'].str.lower().isin(paid.index)]
+    pkgs = _package_for(payers, paid)
+    amounts = paid.reindex(payers['username'].str.lower()).to_numpy()
+    full = [bool(price) and a >= price for (_, price), a in zip(pkgs, amounts)]
+    plan["underpaid"] = {u: {"paid": None if pd.isna(a) else int(a), "price": price} for u, (_, price), a, ok in zip(payers['username'], pkgs, amounts, full) if not ok}
+    payers, pkgs = payers[full], [p for p, ok in zip(pkgs, full) if ok]
+    plan["activate"] = group_by_value((u, new_expiry(e, m * MONTH_DAYS, today)) for u, e, (m, _) in zip(payers['username'], payers['expiry_date'], pkgs))
+    plan["deactivate"] = [u for u in plan["deactivate"] if u not in set(payers['username'])]
+    names = dict(zip(payers['username'].str.lower(), payers['username']))
+    plan["txids"] = {names[u]: ids.tolist() for u, ids in tx.groupby('username')['txid'] if u in names}
+    return plan
+
+
+# --- THỰC THI ---
+def apply_plan(update, plan):
+    """update(changes, usernames) -> list dòng đã cập nhật (vd. bulk_update_data trong app).
+
+    -> (rows, failed): failed là các username không có trong kết quả trả về (nhóm lỗi / không khớp dòng nào).
+    """
+    groups = ([({"is_active": False}, plan["deactivate"])] if plan["deactivate"] else []) + [({"is_active": True, "expiry_date": exp}, names) for exp, names in plan["activate"].items()]
+    rows, failed = [], []
+    for changes, names in groups:
+        try: got = update(changes, names) or []
+        except Exception: got = []
+        done = {r.get('username') for r in got}
+        rows += got; failed += [u for u in names if u not in done]
+    return rows, failed
+
+
+def _load_state(path):
+    try:
+        with open(path, encoding="utf-8") as f: return set(json.load(f))
+    except (OSError, ValueError): return set()
+
+
+def _save_state(path, processed):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f: json.dump(sorted(processed), f)
+    os.replace(tmp, path)
+
+
+def run_sweep(fetch_users, update, transactions_path=None, state_path="lifecycle_state.json", today=None, dry_run=False):
+    """Một lượt quét. fetch_users() -> DataFrame USER_COLS.
+
+    Chỉ giao dịch của user đã thực sự được kích hoạt mới ghi vào state_path; nhóm lỗi sẽ được thử lại ở lượt sau.
+    """
+    with _SWEEP_LOCK:
+        processed = _load_state(state_path)
+        tx = load_transactions(transactions_path) if transactions_path and os.path.exists(transactions_path) else None
+        plan = plan_sweep(fetch_users(), tx, processed, today)
+        report = {"deactivated": len(plan["deactivate"]), "activated": sum(map(len, plan["activate"].values())),
+                  "requests": int(bool(plan["deactivate"])) + len(plan["activate"]), "failed": [], "underpaid": plan["underpaid"], "plan": plan}
+        if dry_run: return report
+        _, failed = apply_plan(update, plan)
+        paid = [t for u, ids in plan["txids"].items() if u not in set(failed) for t in ids]
+        if paid: _save_state(state_path, processed | set(paid))
+        report["failed"] = failed
+        report["deactivated"] -= sum(u in set(failed) for u in plan["deactivate"])
+        report["activated"] -= sum(u in set(failed) for names in plan["activate"].values() for u in names)
+        return report
+
+
+class LifecycleSweeper:
+    """Chạy run_sweep định kỳ trên thread nền (daemon)"""
+
+    def __init__(self, interval=600.0, **sweep_kwargs):
+        self.interval, self.sweep_kwargs = interval, sweep_kwargs
+        self.last_report, self.last_error = None, None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="lifecycle-sweep", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try: self.last_report, self.last_error = run_sweep(**self.sweep_kwargs), None
+            except Exception as e: self.last_error = str(e)
+            self._stop.wait(self.interval)
+
+
+def client_sweep_kwargs(client, transactions_path=None, state_path="lifecycle_state.json"):
+    """Tham số run_sweep dùng trực tiếp một Supabase client (CLI / thread nền)"""
+    def fetch_users():
+        pages = [pd.DataFrame(rows) for rows in fetch_pages(client, "users", USER_COLS)]
+        return pd.concat(pages, ignore_index=True) if pages else pd.DataFrame(columns=USER_COLS.split(","))
+    return {"fetch_users": fetch_users, "update": lambda changes, names: bulk_update(client, "users", changes, "username", names),
+            "transactions_path": transactions_path, "state_path": state_path}
+
+
+if __name__ == "__main__":
+    import time
+    from db import client_from_env
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--transactions", help="CSV sao kê ngân hàng")
+    ap.add_argument("--state", default="lifecycle_state.json", help="file lưu các giao dịch đã xử lý")
+    ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--interval", type=float, default=0, help="giây giữa các lượt (0 = chạy một lần)")
+    args = ap.parse_args()
+    kwargs = client_sweep_kwargs(client_from_env(), args.transactions, args.state)
+    while True:
+        rep = run_sweep(**kwargs, dry_run=args.dry_run)
+        print(f"{'[dry-run] ' if args.dry_run else ''}khoá {rep['deactivated']}, kích hoạt {rep['activated']} ({rep['requests']} request)")
+        for u, v in rep["underpaid"].items(): print(f"  ? {u}: đã chuyển {v['paid'] if v['paid'] is not None else '?'}đ / giá gói {v['price'] or '?'}đ - chưa kích hoạt")
+        if rep["failed"]: print(f"  ! lỗi (thử lại lượt sau): {', '.join(rep['failed'])}")
+        for exp, names in rep["plan"]["activate"].items(): print(f"  + {exp}: {', '.join(names)}")
+        if rep["plan"]["deactivate"]: print(f"  - {', '.join(rep['plan']['deactivate'])}")
+        if not args.interval: break
+        time.sleep(args.interval)
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger(__name__)
+
+TELEGRAM_LIMIT = 4000  # Telegram giới hạn 4096 ký tự / tin
+
+
+class TelegramNotifier:
+    """Gửi thông báo Telegram ở thread nền: hàng đợi giới hạn, gom tin theo đợt, retry backoff, spool khi lỗi.
+
+    notify() không bao giờ chặn luồng Streamlit. Worker giữ một requests.Session (pool + keep-alive).
+    Chỉ 429, 5xx và lỗi kết nối được retry; tin vẫn lỗi sau max_retries được ghi vào spool_path (JSON lines)
+    và gửi lại ở lần start() sau. 4xx khác (400 tin quá dài, 403 bot bị chặn...) là lỗi vĩnh viễn: ghi log và bỏ.
+    base_url cho phép trỏ tới một HTTP server giả lập khi kiểm thử.
+    """
+
+    def __init__(self, token, chat_id, base_url="https://api.telegram.org", spool_path="telegram_spool.jsonl",
+                 maxsize=1000, batch_window=2.0, max_batch=20, max_retries=5, backoff=1.0, timeout=5.0, session=None):
+        self.url = f"{base_url.rstrip('/')}/bot{token}/sendMessage"
+        self._token = token
+        self.chat_id = chat_id
+        self.spool_path = spool_path
+        self.batch_window, self.max_batch = batch_window, max_batch
+        self.max_retries, self.backoff, self.timeout = max_retries, backoff, timeout
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._spool_lock = threading.Lock()
+        self._thread = None
+        self.session = session or self._make_session()
+        self.sent = self.failed = self.spooled = self.dropped = self.rejected = 0
+
+    @staticmethod
+    def _make_session():
+        s = requests.Session()
+        s.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        s.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        return s
+
+    # --- API ---
+    def notify(self, text):
+        """Đưa tin vào hàng đợi; hàng đợi đầy thì ghi thẳng ra spool. Không chặn."""
+        try:
+            self._queue.put_nowait(text); return True
+        except queue.Full:
+            self.dropped += 1; self._spool([text]); return False
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return self
+        self._stop.clear()
+        for text in self._take_spool(): self.notify(text)
+        self._thread = threading.Thread(target=self._run, name="telegram-notifier", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        """Dừng worker sau khi xả hết hàng đợi (tin còn lại sau timeout được spool)"""
+        self._stop.set()
+        if self._thread: self._thread.join(timeout)
+        leftover = self._drain(self.max_batch * 1000)
+        if leftover: self._spool(leftover)
+
+    def stats(self):
+        return {"queued": self._queue.qsize(), "sent": self.sent, "failed": self.failed, "spooled": self.spooled, "dropped": self.dropped, "rejected": self.rejected}
+
+    # --- WORKER ---
+    def _run(self):
+        while True:
+            try: first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stop.is_set(): return
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0: break
+                try: batch.append(self._queue.get(timeout=min(remaining, 0.1)))  # chờ theo lát ngắn để stop() cắt được cửa sổ gom
+                except queue.Empty: continue
+            for text in self._coalesce(batch):
+                ok = self._send_with_retry(text)
+                if ok: self.sent += 1
+                elif ok is None: self.rejected += 1
+                else: self.failed += 1; self._spool([text])
+
+    def _drain(self, limit):
+        out = []
+        while len(out) < limit:
+            try: out.append(self._queue.get_nowait())
+            except queue.Empty: break
+        return out
+
+    @staticmethod
+    def _coalesce(batch):
+        """Gộp một đợt tin thành ít tin nhất có thể (mỗi tin <= TELEGRAM_LIMIT ký tự)"""
+        if len(batch) == 1: return batch
+        chunks, cur = [], []
+        for text in batch:
+            if cur and len("\n".join(cur + [text])) > TELEGRAM_LIMIT:
+                chunks.append(cur); cur = []
+            cur.append(text)
+        chunks.append(cur)
+        return [c[0] if len(c) == 1 else f"📦 {len(c)} thông báo:\n" + "\n".join(c) for c in chunks]
+
+    def _send_with_retry(self, text):
+        """True = đã gửi, False = lỗi tạm thời hết lượt retry (spool), None = Telegram từ chối vĩnh viễn (bỏ)"""
+        for attempt in range(self.max_retries):
+            try:
+                r = self.session.post(self.url, json={"chat_id": self.chat_id, "text": text}, timeout=self.timeout)
+                if r.status_code == 429:  # Telegram báo retry_after khi bị rate limit
+                    wait = (r.json().get("parameters") or {}).get("retry_after", self.backoff * 2 ** attempt)
+                    if self._stop.wait(wait): return False
+                    continue
+                if 400 <= r.status_code < 500:
+                    try: desc = r.json().get("description", "")
+                    except ValueError: desc = ""
+                    log.warning("telegram rejected message (HTTP %d %s), dropped: %.80s", r.status_code, desc, text)
+                    return None
+                r.raise_for_status()
+                return True
+            except Exception as e:
+                log.warning("telegram send failed (attempt %d/%d): %s", attempt + 1, self.max_retries, self._describe(e))
+                if attempt + 1 < self.max_retries and self._stop.wait(self.backoff * 2 ** attempt): return False
+        return False
+
+    def _describe(self, e):
+        """Lỗi để ghi log - URL chứa bot token nên chỉ giữ status code / tên lỗi đã che token"""
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        if status is not None: return f"HTTP {status}"
+        return f"{type(e).__name__}: {str(e).replace(self._token, '***')}" if self._token else type(e).__name__
+
+    # --- SPOOL ---
+    def _spool(self, texts):
+        with self._spool_lock:
+            try:
+                with open(self.spool_path, "a", encoding="utf-8") as f:
+                    for t in texts: f.write(json.dumps({"ts": time.time(), "text": t}, ensure_ascii=False) + "\n")
+                self.spooled += len(texts)
+            except OSError as e:
+                log.error("telegram spool write failed: %s", e)
+
+    def _take_spool(self):
+        with self._spool_lock:
+            if not os.path.exists(self.spool_path): return []
+            try:
+                with open(self.spool_path, encoding="utf-8") as f: texts = [json.loads(line)["text"] for line in f if line.strip()]
+                os.remove(self.spool_path)
+                return texts
+            except (OSError, ValueError, KeyError) as e:
+                log.error("telegram spool read failed: %s", e); return []
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+# --- FORMULAS (GIỮ NGUYÊN) ---
+JP_FORMULAS = {'Nam': {'Bulking': {'Light': {'train': {'p': 3.71, 'c': 4.78, 'f': 0.58}, 'rest': {'p': 3.25, 'c': 2.78, 'f': 1.44}}, 'Moderate': {'train': {'p': 4.07, 'c': 5.23, 'f': 0.35}, 'rest': {'p': 3.10, 'c': 3.10, 'f': 1.83}}, 'High': {'train': {'p': 4.25, 'c': 5.60, 'f': 0.50}, 'rest': {'p': 3.30, 'c': 3.50, 'f': 1.90}}}, 'Maintain': {'Light': {'train': {'p': 3.10, 'c': 3.98, 'f': 0.67}, 'rest': {'p': 3.10, 'c': 1.35, 'f': 0.94}}, 'Moderate': {'train': {'p': 3.38, 'c': 4.37, 'f': 0.85}, 'rest': {'p': 3.00, 'c': 2.58, 'f': 1.33}}, 'High': {'train': {'p': 3.60, 'c': 4.80, 'f': 1.00}, 'rest': {'p': 3.20, 'c': 3.00, 'f': 1.50}}}, 'Cutting': {'Light': {'train': {'p': 2.48, 'c': 3.18, 'f': 0.63}, 'rest': {'p': 2.78, 'c': 1.23, 'f': 0.96}}, 'Moderate': {'train': {'p': 2.71, 'c': 3.01, 'f': 0.70}, 'rest': {'p': 2.74, 'c': 2.05, 'f': 0.92}}, 'High': {'train': {'p': 2.90, 'c': 3.40, 'f': 0.80}, 'rest': {'p': 2.90, 'c': 2.30, 'f': 1.10}}}}, 'Nữ': {'Bulking': {'Light': {'train': {'p': 2.40, 'c': 3.50, 'f': 0.80}, 'rest': {'p': 2.40, 'c': 2.00, 'f': 1.00}}, 'Moderate': {'train': {'p': 2.60, 'c': 4.00, 'f': 0.70}, 'rest': {'p': 2.50, 'c': 2.50, 'f': 1.10}}, 'High': {'train': {'p': 2.80, 'c': 4.50, 'f': 0.80}, 'rest': {'p': 2.60, 'c': 3.00, 'f': 1.20}}}, 'Maintain': {'Light': {'train': {'p': 2.20, 'c': 3.00, 'f': 0.90}, 'rest': {'p': 2.20, 'c': 1.50, 'f': 1.00}}, 'Moderate': {'train': {'p': 2.40, 'c': 3.50, 'f': 0.85}, 'rest': {'p': 2.30, 'c': 2.00, 'f': 1.10}}, 'High': {'train': {'p': 2.50, 'c': 4.00, 'f': 1.00}, 'rest': {'p': 2.40, 'c': 2.50, 'f': 1.20}}}, 'Cutting': {'Light': {'train': {'p': 2.20, 'c': 2.00, 'f': 0.70}, 'rest': {'p': 2.20, 'c': 0.80, 'f': 0.90}}, 'Moderate': {'train': {'p': 2.40, 'c': 2.50, 'f': 0.70}, 'rest': {'p': 2.40, 'c': 1.20, 'f': 0.90}}, 'High': {'train': {'p': 2.50, 'c': 3.00, 'f': 0.80}, 'rest': {'p': 2.50, 'c': 1.50, 'f': 1.00}}}}}
+
+def calc_basic(w, h, a, g, act, goal):
+    if w == 0 or h == 0: return 0, 0, 0, 0
+    bmr = 10*w + 6.25*h - 5*a + 5 if g=='Nam' else 10*w + 6.25*h - 5*a - 161
+    act_map = {'Light':1.375, 'Moderate':1.55, 'High':1.725}
+    tdee = bmr * act_map.get(act, 1.375)
+    target = tdee + 400 if "Tăng" in goal else (tdee if "Cải thiện" in goal else tdee - 400)
+    p, c, f = (target*0.3)/4, (target*0.4)/4, (target*0.3)/9
+    return int(target), int(p), int(c), int(f)
+
+def make_meal_df(p, c, f, type_day):
+    if type_day == 'train': data = [["Bữa 1 (Sáng)", 0, int(p*0.17), int(f*0.4), ""], ["Bữa 2 (Phụ)", int(c*0.25), int(p*0.16), 0, ""], ["PRE-WORKOUT", int(c*0.15), int(p*0.17), int(f*0.3), ""], ["POST-WORKOUT", int(c*0.45), int(p*0.17), 0, ""], ["Bữa 5", int(c*0.15), int(p*0.17), int(f*0.3), ""], ["Bữa 6", 0, int(p*0.16), 0, ""]]
+    else: data = [["Bữa 1", 0, int(p*0.16), int(f*0.25), ""], ["Bữa 2", int(c*0.25), int(p*0.16), int(f*0.15), ""], ["Bữa 3", int(c*0.25), int(p*0.17), int(f*0.15), ""], ["Bữa 4", int(c*0.25), int(p*0.17), int(f*0.15), ""], ["Bữa 5", int(c*0.25), int(p*0.17), int(f*0.15), ""], ["Bữa 6", 0, int(p*0.17), int(f*0.15), ""]]
+    return pd.DataFrame(data, columns=["BỮA", "CARB (g)", "PRO (g)", "FAT (g)", "GỢI Ý"])
+
+
+# ==========================================
+# BATCH: tính cho cả DataFrame khách hàng bằng mảng NumPy
+# ==========================================
+GENDERS = ('Nam', 'Nữ')
+GOALS = ('Bulking', 'Maintain', 'Cutting')
+ACTIVITIES = ('Light', 'Moderate', 'High')
+DAY_TYPES = ('train', 'rest')
+MACROS = ('p', 'c', 'f')
+ACT_FACTORS = np.array([1.375, 1.55, 1.725])
+# JP_FORMULAS trải phẳng thành mảng [giới tính, mục tiêu, vận động, loại ngày, macro] (g / kg cân nặng)
+JP_ARRAY = np.array([[[[[JP_FORMULAS[g][goal][act][d][m] for m in MACROS] for d in DAY_TYPES] for act in ACTIVITIES] for goal in GOALS] for g in GENDERS])
+
+# Tỉ lệ chia macro theo bữa - giống hệt make_meal_df: (tên bữa, carb, pro, fat)
+MEAL_SPLITS = {
+    'train': (["Bữa 1 (Sáng)", "Bữa 2 (Phụ)", "PRE-WORKOUT", "POST-WORKOUT", "Bữa 5", "Bữa 6"],
+              np.array([0, 0.25, 0.15, 0.45, 0.15, 0]), np.array([0.17, 0.16, 0.17, 0.17, 0.17, 0.16]), np.array([0.4, 0, 0.3, 0, 0.3, 0])),
+    'rest': (["Bữa 1", "Bữa 2", "Bữa 3", "Bữa 4", "Bữa 5", "Bữa 6"],
+             np.array([0, 0.25, 0.25, 0.25, 0.25, 0]), np.array([0.16, 0.16, 0.17, 0.17, 0.17, 0.17]), np.array([0.25, 0.15, 0.15, 0.15, 0.15, 0.15])),
+}
+DEFAULT_COLS = {'weight': 'start_weight', 'height': 'height', 'age': 'age', 'gender': 'gender', 'activity': 'activity', 'goal': 'goal'}
+DEFAULT_VALUES = {'weight': 0.0, 'height': 0.0, 'age': 0, 'gender': 'Nam', 'activity': 'Light', 'goal': 'Tăng cân'}
+
+
+NUMERIC_FIELDS = ('weight', 'height', 'age')
+
+
+def missing_fields(df, cols=None):
+    """Tên các cột còn thiếu / bằng 0 của từng dòng ('' = đủ dữ liệu để tính, không phải đoán mặc định)"""
+    cols = {**DEFAULT_COLS, **(cols or {})}
+    out = pd.Series("", index=df.index)
+    for name in DEFAULT_COLS:
+        col = cols[name]
+        if col not in df: miss = pd.Series(True, index=df.index)
+        elif name in NUMERIC_FIELDS: miss = ~(pd.to_numeric(df[col], errors='coerce') > 0)
+        else: miss = df[col].isna() | (df[col].astype(str).str.strip() == "")
+        out = out.where(~miss, out + f"{col}, ")
+    return out.str.rstrip(", ")
+
+
+def _column(df, cols, name):
+    col = cols.get(name)
+    if col in df: return df[col].fillna(DEFAULT_VALUES[name])
+    return pd.Series(DEFAULT_VALUES[name], index=df.index)
+
+
+def batch_targets(df, cols=None):
+    """calc_basic cho mọi dòng cùng lúc + gram macro theo JP_FORMULAS (train/rest).
+
+    cols ánh xạ tên trường -> tên cột trong df (mặc định DEFAULT_COLS); cột thiếu dùng DEFAULT_VALUES -
+    lọc trước bằng missing_fields() nếu không muốn số liệu dựa trên giá trị mặc định.
+    Kết quả TARGET/PRO/CARB/FAT khớp từng dòng với calc_basic.
+    """
+    cols = {**DEFAULT_COLS, **(cols or {})}
+    w = _column(df, cols, 'weight').to_numpy(dtype=float)
+    h = _column(df, cols, 'height').to_numpy(dtype=float)
+    a = _column(df, cols, 'age').to_numpy(dtype=float)
+    g_idx = (_column(df, cols, 'gender').to_numpy() != 'Nam').astype(np.intp)
+    act = pd.Categorical(_column(df, cols, 'activity'), categories=ACTIVITIES).codes
+    act_idx = np.where(act < 0, 0, act)  # giá trị lạ -> Light như act_map.get(act, 1.375)
+    goal = _column(df, cols, 'goal').astype(str)
+    bulk, keep = goal.str.contains("Tăng", regex=False).to_numpy(), goal.str.contains("Cải thiện", regex=False).to_numpy()
+    goal_idx = np.where(bulk, 0, np.where(keep, 1, 2))
+
+    bmr = 10 * w + 6.25 * h - 5 * a + np.where(g_idx == 0, 5, -161)
+    tdee = bmr * ACT_FACTORS[act_idx]
+    target = np.where(bulk, tdee + 400, np.where(keep, tdee, tdee - 400))
+    valid = (w != 0) & (h != 0)
+    out = pd.DataFrame(index=df.index)
+    out['BMR'], out['TDEE'] = np.where(valid, bmr, 0), np.where(valid, tdee, 0)
+    for name, val in (('TARGET', target), ('PRO', (target * 0.3) / 4), ('CARB', (target * 0.4) / 4), ('FAT', (target * 0.3) / 9)):
+        out[name] = np.where(valid, np.trunc(val), 0).astype(np.int64)
+    jp = JP_ARRAY[g_idx, goal_idx, act_idx] * w[:, None, None]  # (n, loại ngày, macro)
+    for d, day in enumerate(DAY_TYPES):
+        for m, macro in enumerate(MACROS): out[f'JP_{day}_{macro}'] = np.round(jp[:, d, m], 1)
+    return out
+
+
+def batch_meal_plans(targets, type_day):
+    """make_meal_df cho mọi khách: DataFrame dài (client = index của targets) x 6 bữa"""
+    names, c_split, p_split, f_split = MEAL_SPLITS[type_day]
+    p, c, f = (targets[k].to_numpy(dtype=float)[:, None] for k in ('PRO', 'CARB', 'FAT'))
+    n, k = len(targets), len(names)
+    return pd.DataFrame({
+        'client': np.repeat(targets.index.to_numpy(), k),
+        'BỮA': np.tile(names, n),
+        'CARB (g)': np.trunc(c * c_split).astype(np.int64).ravel(),
+        'PRO (g)': np.trunc(p * p_split).astype(np.int64).ravel(),
+        'FAT (g)': np.trunc(f * f_split).astype(np.int64).ravel(),
+        'GỢI Ý': "",
+    })
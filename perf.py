@@ -0,0 +1,68 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger("ld_perf")
+_page = contextvars.ContextVar("perf_page", default="-")
+
+
+class PerfRecorder:
+    """Đo thời gian hot-path: mỗi span (query, write, auth, compute, chart, section, rerun) gắn tag trang + bảng.
+
+    Giữ maxlen span gần nhất trong ring buffer (deque) để tính p50/p95/p99 cuộn; mỗi span được ghi
+    log JSON ở mức DEBUG, span chậm hơn slow_ms ở mức WARNING.
+    """
+
+    def __init__(self, maxlen=5000, slow_ms=1000.0):
+        self.slow_ms = slow_ms
+        self._spans = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def set_page(page):
+        """Tag trang cho các span tiếp theo trong luồng script hiện tại"""
+        _page.set(page or "-")
+
+    @contextmanager
+    def span(self, kind, name, table=None, **tags):
+        t0 = time.perf_counter()
+        try: yield
+        finally: self.record(kind, name, (time.perf_counter() - t0) * 1000, table, **tags)
+
+    def record(self, kind, name, ms, table=None, **tags):
+        item = {"ts": time.time(), "kind": kind, "name": name, "page": _page.get(), "table": table, "ms": round(ms, 3), **tags}
+        with self._lock: self._spans.append(item)
+        if log.isEnabledFor(logging.DEBUG) or ms >= self.slow_ms:
+            log.log(logging.WARNING if ms >= self.slow_ms else logging.DEBUG, json.dumps(item, ensure_ascii=False, default=str))
+
+    def spans(self):
+        with self._lock: return list(self._spans)
+
+    def reset(self):
+        with self._lock: self._spans.clear()
+
+    def summary(self, by=("kind", "name", "table")):
+        """count / p50 / p95 / p99 / max (ms) theo nhóm trên ring buffer hiện tại"""
+        df = pd.DataFrame(self.spans())
+        cols = list(by) + ["count", "p50", "p95", "p99", "max"]
+        if df.empty: return pd.DataFrame(columns=cols)
+        df[list(by)] = df[list(by)].fillna("-")
+        g = df.groupby(list(by))["ms"]
+        out = g.agg(count="size", max="max").join(g.quantile([0.5, 0.95, 0.99]).unstack().set_axis(["p50", "p95", "p99"], axis=1))
+        return out.reset_index()[cols].sort_values("p95", ascending=False).round(1).reset_index(drop=True)
+
+    def histogram(self, kind=None, bins=20):
+        """Histogram thời gian (ms, thang log) cho một loại span"""
+        ms = np.array([s["ms"] for s in self.spans() if kind is None or s["kind"] == kind])
+        if not len(ms): return pd.DataFrame(columns=["ms", "count"])
+        lo = max(ms.min(), 0.01)
+        edges = np.geomspace(lo, max(ms.max(), lo * 2), bins + 1)
+        counts, _ = np.histogram(ms, bins=edges)
+        return pd.DataFrame({"ms": edges[1:].round(2), "count": counts})
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """Cache đọc-xuyên cho run_query: TTL + LRU giới hạn kích thước, xoá theo bảng khi có ghi"""
+
+    def __init__(self, max_entries=256, ttl=60.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._epoch, self._gens = 0, {}  # tăng mỗi lần invalidate (toàn bộ / theo bảng)
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    @staticmethod
+    def make_key(table_name, select="*", filter_col=None, filter_val=None, order_by=None, filters=None, limit=None, after=None):
+        return (table_name, select, filter_col, filter_val, tuple(order_by) if order_by else None,
+                tuple(map(tuple, filters)) if filters else None, limit, tuple(after) if after else None)
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1; return None
+            if item[0] <= self._clock():
+                del self._data[key]; self.misses += 1; return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def generation(self, table_name):
+        """Đọc trước khi query, truyền lại cho put() để bỏ kết quả đọc trước một lần ghi"""
+        with self._lock: return self._epoch, self._gens.get(table_name, 0)
+
+    def put(self, key, value, generation=None):
+        """Lưu kết quả; bỏ qua (trả False) nếu bảng đã bị invalidate kể từ `generation`"""
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._gens.get(key[0], 0)): return False
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False); self.evictions += 1
+            return True
+
+    def invalidate(self, table_name=None):
+        """Xoá mọi entry của một bảng (hoặc toàn bộ nếu table_name=None)"""
+        with self._lock:
+            if table_name is None:
+                n = len(self._data); self._data.clear(); self._epoch += 1
+            else:
+                self._gens[table_name] = self._gens.get(table_name, 0) + 1
+                keys = [k for k in self._data if k[0] == table_name]
+                for k in keys: del self._data[k]
+                n = len(keys)
+            self.invalidations += n
+            return n
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": (self.hits / total) if total else 0.0,
+                    "size": len(self._data), "evictions": self.evictions, "invalidations": self.invalidations}
@@ -0,0 +1,130 @@
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from analytics import build_revenue_frame, rollups_from_base
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contrib (
+    username TEXT PRIMARY KEY, full_name TEXT, start_ts TEXT NOT NULL,
+    day TEXT NOT NULL, package TEXT NOT NULL, revenue INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS contrib_day ON contrib(day);
+CREATE TABLE IF NOT EXISTS daily (
+    day TEXT NOT NULL, package TEXT NOT NULL, revenue INTEGER NOT NULL, users INTEGER NOT NULL,
+    PRIMARY KEY (day, package)
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+class RevenueRollupStore:
+    """Bảng tổng hợp doanh thu theo ngày x gói, lưu SQLite cục bộ, cập nhật tăng dần.
+
+    contrib giữ đóng góp hiện tại của từng user để khi sửa/xoá chỉ cần trừ bucket cũ
+    và cộng bucket mới. Dashboard chỉ đọc bảng daily nên chi phí tỉ lệ với số ngày.
+    """
+
+    def __init__(self, path="revenue_rollups.db", watermark_col="created_at"):
+        self.watermark_col = watermark_col
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    # --- GHI ---
+    def apply_users(self, df_users):
+        """Upsert đóng góp của các user (DataFrame các dòng bảng users)"""
+        if df_users is None or df_users.empty or 'username' not in df_users: return 0
+        df = build_revenue_frame(df_users[df_users['username'] != 'admin'])
+        if df.empty: return 0
+        rows = list(zip(df['username'], df['full_name'] if 'full_name' in df else [None] * len(df),
+                        df['Start_Date'].dt.strftime('%Y-%m-%d %H:%M:%S'), df['Start_Date'].dt.strftime('%Y-%m-%d'),
+                        df['Package'].astype(str), df['Revenue'].astype(int)))
+        with self._lock, self._conn:
+            for row in rows:
+                self._remove(row[0])
+                self._conn.execute("INSERT INTO contrib VALUES (?,?,?,?,?,?)", row)
+                self._conn.execute("INSERT INTO daily VALUES (?,?,?,1) ON CONFLICT(day, package) DO UPDATE SET revenue=revenue+excluded.revenue, users=users+1", (row[3], row[4], row[5]))
+        return len(rows)
+
+    def remove_users(self, usernames):
+        with self._lock, self._conn:
+            for u in usernames: self._remove(u)
+
+    def _remove(self, username):
+        old = self._conn.execute("SELECT day, package, revenue FROM contrib WHERE username=?", (username,)).fetchone()
+        if old is None: return
+        self._conn.execute("DELETE FROM contrib WHERE username=?", (username,))
+        self._conn.execute("UPDATE daily SET revenue=revenue-?, users=users-1 WHERE day=? AND package=?", (old[2], old[0], old[1]))
+        self._conn.execute("DELETE FROM daily WHERE day=? AND package=? AND users<=0", (old[0], old[1]))
+
+    def reset(self):
+        with self._lock, self._conn:
+            for t in ("contrib", "daily", "meta"): self._conn.execute(f"DELETE FROM {t}")
+
+    # --- ĐỒNG BỘ THEO WATERMARK ---
+    def _meta(self, key):
+        with self._lock: row = self._conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        with self._lock, self._conn: self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(value)))
+
+    @property
+    def watermark(self):
+        return self._meta('watermark')
+
+    @property
+    def reconciled_at(self):
+        """epoch giây của lần đối soát toàn bộ gần nhất (None = chưa có)"""
+        v = self._meta('reconciled_at')
+        return float(v) if v else None
+
+    def catch_up(self, fetch_since, reconcile_every=None):
+        """fetch_since(watermark) -> các trang DataFrame user có watermark_col >= watermark (None = toàn bộ).
+
+        Dòng trùng watermark được áp lại (upsert, không sai số). Chỉ bắt được dòng *thêm* ngoài app; dòng bị
+        sửa/xoá ngoài app được sửa ở lần đối soát toàn bộ: khi chưa có watermark hoặc reconcile_every giây
+        đã trôi qua, đọc lại cả bảng và bỏ các user không còn tồn tại. Lỗi khi đọc được ném ra, không xoá gì.
+        """
+        full = self.watermark is None or (reconcile_every is not None and time.time() - (self.reconciled_at or 0) > reconcile_every)
+        pages = fetch_since(None if full else self.watermark)
+        if isinstance(pages, pd.DataFrame): pages = [pages]
+        n, wm, seen = 0, self.watermark, set()
+        for df in pages:
+            if df is None or df.empty: continue
+            n += self.apply_users(df)
+            if 'username' in df: seen.update(df['username'])
+            if self.watermark_col in df:
+                page_wm = df[self.watermark_col].dropna().astype(str)
+                if not page_wm.empty and (wm is None or page_wm.max() > wm): wm = page_wm.max()
+        if full:
+            with self._lock: known = [r[0] for r in self._conn.execute("SELECT username FROM contrib")]
+            self.remove_users([u for u in known if u not in seen])
+            self._set_meta('reconciled_at', time.time())
+        if wm is not None and wm != self.watermark: self._set_meta('watermark', wm)
+        return n
+
+    # --- ĐỌC ---
+    def base(self, start_day=None, end_day=None):
+        q, args = "SELECT day, package, revenue, users FROM daily WHERE 1=1", []
+        if start_day: q += " AND day >= ?"; args.append(str(start_day))
+        if end_day: q += " AND day < ?"; args.append(str(end_day))
+        with self._lock: rows = self._conn.execute(q + " ORDER BY day", args).fetchall()
+        base = pd.DataFrame(rows, columns=['Day', 'Package', 'Revenue', 'Users'])
+        base['Day'] = pd.to_datetime(base['Day'])
+        return base
+
+    def rollups(self, start_day=None, end_day=None):
+        return rollups_from_base(self.base(start_day, end_day))
+
+    def detail(self, month_key=None):
+        """Các user đóng góp vào tháng 'YYYY-MM' (None = tất cả) - dùng cho bảng chi tiết"""
+        q, args = "SELECT start_ts, username, full_name, package, revenue FROM contrib", ()
+        if month_key: q, args = q + " WHERE day LIKE ?", (f"{month_key}-%",)
+        with self._lock: rows = self._conn.execute(q + " ORDER BY start_ts", args).fetchall()
+        df = pd.DataFrame(rows, columns=['Start_Date', 'username', 'full_name', 'Package', 'Revenue'])
+        df['Start_Date'] = pd.to_datetime(df['Start_Date'])
+        return df
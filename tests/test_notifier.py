@@ -0,0 +1,109 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from notifier import TelegramNotifier
+
+TOKEN = "123456:SECRET-BOT-TOKEN"
+
+
+class FakeTelegram:
+    """HTTP server giả lập sendMessage: trả lần lượt các status trong `script`, sau đó 200"""
+
+    def __init__(self, script=()):
+        self.script, self.received, self.hits = list(script), [], 0
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                outer.hits += 1
+                status = outer.script.pop(0) if outer.script else 200
+                if status == 200: outer.received.append(body["text"])
+                payload = {"ok": status == 200, "parameters": {"retry_after": 0.01}} if status == 429 else {"ok": status == 200}
+                data = json.dumps(payload).encode()
+                self.send_response(status); self.send_header("Content-Length", str(len(data))); self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args): pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown(); self.server.server_close()
+
+
+@pytest.fixture
+def make(tmp_path):
+    servers, notifiers = [], []
+
+    def _make(script=(), **kw):
+        srv = FakeTelegram(script); servers.append(srv)
+        n = TelegramNotifier(TOKEN, 42, base_url=srv.base_url, spool_path=str(tmp_path / "spool.jsonl"),
+                             **{"batch_window": 0.2, "backoff": 0.01, "timeout": 2.0, **kw})
+        notifiers.append(n)
+        return srv, n
+
+    yield _make
+    for n in notifiers: n.stop(2.0)
+    for s in servers: s.close()
+
+
+def wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond(): return True
+        time.sleep(0.02)
+    return False
+
+
+def test_coalesces_burst_into_one_message(make):
+    srv, n = make()
+    for i in range(5): n.notify(f"tin {i}")
+    n.start()
+    assert wait_for(lambda: n.sent == 1)
+    assert srv.hits == 1
+    assert srv.received[0].startswith("📦 5 thông báo:") and "tin 4" in srv.received[0]
+
+
+def test_retries_500_and_429_then_succeeds(make):
+    srv, n = make(script=[500, 429])
+    n.start().notify("xin chào")
+    assert wait_for(lambda: n.sent == 1)
+    assert srv.hits == 3 and srv.received == ["xin chào"]
+
+
+def test_failed_send_is_spooled_and_replayed(make, caplog):
+    srv, n = make(script=[500] * 3, max_retries=3)
+    with caplog.at_level(logging.WARNING, logger="notifier"):
+        n.start().notify("đơn mới")
+        assert wait_for(lambda: n.spooled == 1)
+    assert TOKEN not in caplog.text and "HTTP 500" in caplog.text
+    n.stop(2.0)
+
+    srv2, n2 = make()
+    n2.spool_path = n.spool_path
+    n2.start()
+    assert wait_for(lambda: n2.sent == 1)
+    assert srv2.received == ["đơn mới"]
+
+
+def test_permanent_4xx_is_dropped_not_retried_or_spooled(make):
+    srv, n = make(script=[400])
+    n.start().notify("quá dài")
+    assert wait_for(lambda: n.rejected == 1)
+    assert srv.hits == 1 and n.spooled == 0 and n.failed == 0
+
+
+def test_stop_flushes_messages_still_batching(make):
+    srv, n = make(batch_window=5.0)
+    n.start().notify("đang gom")
+    time.sleep(0.2)
+    n.stop(2.0)
+    assert srv.received == ["đang gom"] and n.stats()["queued"] == 0